@@ -0,0 +1,120 @@
+# Measures concurrent donations to a single campaign, for several shard counts
+#
+# Needs a database (POSTGRES_CONNECTION_URL), and runs as many concurrent
+# donors as connections in the pool (POSTGRES_POOL_SIZE).
+#
+# Usage: python -m benchmarks.campaign_contention
+
+import asyncio
+import logging
+import time
+from uuid import uuid4
+
+from bounded_contexts.crowdfunding.adapters.repositories import campaign_repository
+from bounded_contexts.crowdfunding.aggregates import Campaign, Donation
+from config.env import environment
+from infrastructure.events.retry import CONTENDED_RETRY_POLICY
+from infrastructure.events.uow_factory import make_postgres_unit_of_work
+from infrastructure.postgres import execute_ddl, postgres_pool
+
+SHARD_COUNTS = (1, 4, 16, 64)
+DONATIONS = 2_000
+AMOUNT = 1
+
+
+async def donate(campaign_id: str) -> None:
+    async with make_postgres_unit_of_work() as uow:
+        repository = campaign_repository(uow)
+        [campaign] = await repository.find_by_ids([campaign_id])
+
+        key = uuid4().hex
+        await repository.load_donations([campaign], [key])
+        campaign.donate(Donation(key, AMOUNT, "0a1b2c3d4e5f60718293a4b5c6d7e8f9"))
+
+
+async def donor(campaign_id: str, queue: asyncio.Queue) -> int:
+    failures = 0
+
+    while not queue.empty():
+        queue.get_nowait()
+
+        try:
+            await CONTENDED_RETRY_POLICY.run(lambda: donate(campaign_id))
+        except Exception:
+            failures += 1
+
+    return failures
+
+
+async def measure(shard_count: int) -> tuple[float, int, int]:
+    campaign_id = uuid4().hex
+
+    async with make_postgres_unit_of_work() as uow:
+        await campaign_repository(uow).add(
+            Campaign(
+                entity_id=campaign_id,
+                account_id="6f1c2e0b4b9a4a8c9d0e1f2a3b4c5d6e",
+                title="Campaign",
+                description="Campaign",
+                goal=DONATIONS * AMOUNT,
+                shard_count=shard_count,
+            )
+        )
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(DONATIONS):
+        queue.put_nowait(None)
+
+    start = time.perf_counter()
+    failures = await asyncio.gather(
+        *(donor(campaign_id, queue) for _ in range(environment.postgres_pool_size))
+    )
+    elapsed = time.perf_counter() - start
+
+    async with make_postgres_unit_of_work() as uow:
+        [campaign] = await campaign_repository(uow).find_by_ids([campaign_id])
+
+    assert campaign.total_raised == (DONATIONS - sum(failures)) * AMOUNT
+
+    async with postgres_pool.get_pool().acquire() as conn:
+        for table, column in (
+            ("campaign_donations", "campaign_id"),
+            ("campaign_raised_shards", "campaign_id"),
+            ("campaigns", "entity_id"),
+        ):
+            await conn.execute(f"DELETE FROM {table} WHERE {column} = $1", campaign_id)
+
+    # Only the donations that went through count
+    return (DONATIONS - sum(failures)) / elapsed, sum(failures), campaign.total_raised
+
+
+async def main() -> None:
+    # Retries of the unsharded campaign would flood the output
+    logging.getLogger("infrastructure.events.retry").setLevel(logging.ERROR)
+
+    await postgres_pool.start_pool()
+    await execute_ddl()
+
+    print(f"{environment.postgres_pool_size} concurrent donors")
+    print(
+        f"{'shards':>7} {'donations/s':>12} {'speedup':>8} {'failed':>7} {'raised':>7}"
+    )
+
+    try:
+        baseline = None
+
+        for shard_count in SHARD_COUNTS:
+            throughput, failures, raised = await measure(shard_count)
+            baseline = baseline or throughput
+
+            print(
+                f"{shard_count:>7} {throughput:>12.0f} {throughput / baseline:>7.1f}x "
+                f"{failures:>7} {raised:>7}"
+            )
+
+    finally:
+        await postgres_pool.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
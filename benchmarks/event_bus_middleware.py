@@ -0,0 +1,57 @@
+# Measures the overhead of the event bus middleware on handler calls
+#
+# Usage: python -m benchmarks.event_bus_middleware
+
+import asyncio
+import time
+from dataclasses import dataclass
+
+from infrastructure.events.bus import EventBus
+from infrastructure.events.messages import Command
+from infrastructure.events.middleware import metrics_middleware
+
+ROUNDS = 100_000
+
+
+@dataclass(frozen=True, slots=True)
+class BenchmarkCommand(Command):
+    account_id: str
+
+
+async def handle_benchmark(command: BenchmarkCommand) -> None:
+    pass
+
+
+async def microseconds(bus: EventBus) -> float:
+    command = BenchmarkCommand(account_id="6f1c2e0b4b9a4a8c9d0e1f2a3b4c5d6e")
+    timings = []
+
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            await bus.handle(command)
+
+        timings.append(time.perf_counter() - start)
+
+    return min(timings) / ROUNDS * 1e6
+
+
+async def main() -> None:
+    bare_bus = EventBus()
+    bare_bus.register_command_handler(BenchmarkCommand, handle_benchmark)
+
+    metrics_bus = EventBus()
+    metrics_bus.register_command_handler(BenchmarkCommand, handle_benchmark)
+    metrics_bus.add_middleware(metrics_middleware)
+
+    bare = await microseconds(bare_bus)
+    with_metrics = await microseconds(metrics_bus)
+
+    print(f"{'middleware':<12} {'µs per call':>12}")
+    print(f"{'none':<12} {bare:>12.2f}")
+    print(f"{'metrics':<12} {with_metrics:>12.2f}")
+    print(f"{'overhead':<12} {with_metrics - bare:>12.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
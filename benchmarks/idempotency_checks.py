@@ -0,0 +1,56 @@
+# Measures duplicate detection in aggregates with a long history
+#
+# Usage: python -m benchmarks.idempotency_checks
+
+import timeit
+
+from bounded_contexts.accounting.aggregates import Account, Transaction
+from bounded_contexts.crowdfunding.aggregates import Campaign, Donation
+
+HISTORY_SIZES = (10_000, 100_000, 1_000_000)
+ROUNDS = 100_000
+
+
+def microseconds(statement) -> float:
+    return min(timeit.repeat(statement, number=ROUNDS, repeat=5)) / ROUNDS * 1e6
+
+
+def main() -> None:
+    print(f"{'history':>10} {'deposit µs':>11} {'withdraw µs':>12} {'donate µs':>10}")
+
+    for size in HISTORY_SIZES:
+        keys = [f"{i:032x}" for i in range(size)]
+
+        account = Account(
+            account_id="6f1c2e0b4b9a4a8c9d0e1f2a3b4c5d6e",
+            balance=size,
+            transactions=[Transaction(key, 1, {}) for key in keys],
+        )
+        campaign = Campaign(
+            entity_id="9f8e7d6c5b4a39281706f5e4d3c2b1a0",
+            account_id="6f1c2e0b4b9a4a8c9d0e1f2a3b4c5d6e",
+            title="Campaign",
+            description="Campaign",
+            goal=size,
+            total_raised=size,
+            donations=[
+                Donation(key, 1, "0a1b2c3d4e5f60718293a4b5c6d7e8f9") for key in keys
+            ],
+        )
+
+        # The oldest key, the worst case for a linear scan
+        duplicate = keys[0]
+        donation = Donation(duplicate, 1, "0a1b2c3d4e5f60718293a4b5c6d7e8f9")
+
+        print(
+            f"{size:>10} "
+            f"{microseconds(lambda: account.deposit(duplicate, 1, {})):>11.3f} "
+            f"{microseconds(lambda: account.withdraw(duplicate, 1, {})):>12.3f} "
+            f"{microseconds(lambda: campaign.donate(donation)):>10.3f}"
+        )
+
+        assert account.balance == size and campaign.total_raised == size
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Measures the cost of creating and serializing messages
+#
+# Usage: python -m benchmarks.message_classes
+
+import sys
+import timeit
+from dataclasses import asdict
+
+from bounded_contexts.accounting.messages import (
+    DepositCommand,
+    RequestTransferCommand,
+    TransferSucceededEvent,
+)
+from infrastructure.events.codec import message_codec
+
+ROUNDS = 50_000
+
+FACTORIES = {
+    "DepositCommand": lambda: DepositCommand(
+        account_id="6f1c2e0b4b9a4a8c9d0e1f2a3b4c5d6e",
+        idempotency_key="d4c2b1a0f9e8d7c6b5a4f3e2d1c0b9a8",
+        amount=21_000,
+        metadata={"payment_hash": "ab" * 32},
+    ),
+    "RequestTransferCommand": lambda: RequestTransferCommand(
+        idempotency_key="d4c2b1a0f9e8d7c6b5a4f3e2d1c0b9a8",
+        from_account_id="6f1c2e0b4b9a4a8c9d0e1f2a3b4c5d6e",
+        to_account_id="0a1b2c3d4e5f60718293a4b5c6d7e8f9",
+        amount=5_000,
+        metadata={"campaign_id": "9f8e7d6c5b4a39281706f5e4d3c2b1a0"},
+    ),
+    "TransferSucceededEvent": lambda: TransferSucceededEvent(
+        idempotency_key="d4c2b1a0f9e8d7c6b5a4f3e2d1c0b9a8",
+        from_account_id="6f1c2e0b4b9a4a8c9d0e1f2a3b4c5d6e",
+        to_account_id="0a1b2c3d4e5f60718293a4b5c6d7e8f9",
+        amount=5_000,
+        metadata={"campaign_id": "9f8e7d6c5b4a39281706f5e4d3c2b1a0"},
+    ),
+}
+
+
+def microseconds(statement) -> float:
+    return min(timeit.repeat(statement, number=ROUNDS, repeat=5)) / ROUNDS * 1e6
+
+
+def main() -> None:
+    print(
+        f"{'message':<24} {'bytes':>6} {'create µs':>10} {'to_dict µs':>11} "
+        f"{'asdict µs':>10} {'encode µs':>10}"
+    )
+
+    for name, factory in FACTORIES.items():
+        message = factory()
+
+        assert message.to_dict() == asdict(message)
+
+        # Instances are slotted, so there's no __dict__ to account for
+        size = sys.getsizeof(message) + sys.getsizeof(getattr(message, "__dict__", {}))
+
+        print(
+            f"{name:<24} {size:>6} "
+            f"{microseconds(factory):>10.2f} "
+            f"{microseconds(message.to_dict):>11.2f} "
+            f"{microseconds(lambda: asdict(message)):>10.2f} "
+            f"{microseconds(lambda: message_codec.encode(message)):>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Compares the outbox message codec against pickle
+#
+# Usage: python -m benchmarks.outbox_codec
+
+import pickle
+import timeit
+
+from bounded_contexts.accounting.messages import (
+    DepositCommand,
+    RequestTransferCommand,
+    TransferSucceededEvent,
+)
+from bounded_contexts.auth.messages import SignupEvent
+from bounded_contexts.bitcoin.aggregates import InvoiceType
+from bounded_contexts.bitcoin.messages import CreateInvoice
+from infrastructure.events.codec import message_codec
+from infrastructure.events.messages import Message
+
+ROUNDS = 20_000
+
+MESSAGES: list[Message] = [
+    SignupEvent(account_id="6f1c2e0b4b9a4a8c9d0e1f2a3b4c5d6e"),
+    DepositCommand(
+        account_id="6f1c2e0b4b9a4a8c9d0e1f2a3b4c5d6e",
+        idempotency_key="d4c2b1a0f9e8d7c6b5a4f3e2d1c0b9a8",
+        amount=21_000,
+        metadata={
+            "payment_hash": "ab" * 32,
+            "payment_request": "lnbc210n1" + "x" * 250,
+        },
+    ),
+    RequestTransferCommand(
+        idempotency_key="d4c2b1a0f9e8d7c6b5a4f3e2d1c0b9a8",
+        from_account_id="6f1c2e0b4b9a4a8c9d0e1f2a3b4c5d6e",
+        to_account_id="0a1b2c3d4e5f60718293a4b5c6d7e8f9",
+        amount=5_000,
+        metadata={"campaign_id": "9f8e7d6c5b4a39281706f5e4d3c2b1a0"},
+    ),
+    TransferSucceededEvent(
+        idempotency_key="d4c2b1a0f9e8d7c6b5a4f3e2d1c0b9a8",
+        from_account_id="6f1c2e0b4b9a4a8c9d0e1f2a3b4c5d6e",
+        to_account_id="0a1b2c3d4e5f60718293a4b5c6d7e8f9",
+        amount=5_000,
+        metadata={"campaign_id": "9f8e7d6c5b4a39281706f5e4d3c2b1a0"},
+    ),
+    CreateInvoice(
+        account_id="6f1c2e0b4b9a4a8c9d0e1f2a3b4c5d6e",
+        payment_hash="ab" * 32,
+        payment_request="lnbc210n1" + "x" * 250,
+        amount=21_000,
+        invoice_type=InvoiceType.DEPOSIT,
+    ),
+]
+
+
+def microseconds(statement) -> float:
+    return min(timeit.repeat(statement, number=ROUNDS, repeat=5)) / ROUNDS * 1e6
+
+
+def main() -> None:
+    print(
+        f"{'message':<24} {'format':<8} {'bytes':>6} {'encode µs':>10} {'decode µs':>10}"
+    )
+
+    for message in MESSAGES:
+        pickled = pickle.dumps(message)
+        encoded = message_codec.encode(message)
+
+        assert message_codec.decode(encoded) == message
+
+        rows = [
+            (
+                "pickle",
+                len(pickled),
+                microseconds(lambda: pickle.dumps(message)),
+                microseconds(lambda: pickle.loads(pickled)),
+            ),
+            (
+                "codec",
+                len(encoded),
+                microseconds(lambda: message_codec.encode(message)),
+                microseconds(lambda: message_codec.decode(encoded)),
+            ),
+        ]
+
+        for name, size, encode_time, decode_time in rows:
+            print(
+                f"{type(message).__name__:<24} {name:<8} {size:>6} "
+                f"{encode_time:>10.2f} {decode_time:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
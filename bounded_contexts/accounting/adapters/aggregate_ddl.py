@@ -1,7 +1,45 @@
 ACCOUNTING_AGGREGATE_DDL = """
     CREATE TABLE IF NOT EXISTS accounting_accounts (
         account_id VARCHAR PRIMARY KEY,
-        transactions JSONB,
-        balance INT
+        balance INT,
+        version INT NOT NULL DEFAULT 1
     );
+
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'accounting_accounts' AND column_name = 'version'
+        ) THEN
+            ALTER TABLE accounting_accounts ADD COLUMN version INT NOT NULL DEFAULT 1;
+        END IF;
+    END $$;
+
+    CREATE TABLE IF NOT EXISTS accounting_ledger (
+        account_id VARCHAR NOT NULL,
+        idempotency_key VARCHAR NOT NULL,
+        amount INT NOT NULL,
+        metadata JSONB NOT NULL DEFAULT '{}',
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (account_id, idempotency_key)
+    );
+
+    -- Transactions used to be stored in a JSONB column of the accounts
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'accounting_accounts' AND column_name = 'transactions'
+        ) THEN
+            INSERT INTO accounting_ledger (account_id, idempotency_key, amount, metadata)
+            SELECT
+                a.account_id, t->>'idempotency_key', (t->>'amount')::int,
+                COALESCE(t->'metadata', '{}')
+            FROM accounting_accounts a, jsonb_array_elements(a.transactions) t
+            WHERE a.transactions IS NOT NULL
+            ON CONFLICT (account_id, idempotency_key) DO NOTHING;
+
+            ALTER TABLE accounting_accounts DROP COLUMN transactions;
+        END IF;
+    END $$;
 """
@@ -1,9 +1,12 @@
 import json
 
+from asyncpg import Record
+
 from bounded_contexts.accounting.aggregates import Account, Transaction
 from bounded_contexts.accounting.ports.repositories import AccountRepository
 from bounded_contexts.common.adapters.repository_adapters import MockRepository
 from infrastructure.events.unit_of_work import (
+    ConcurrencyConflictError,
     UnitOfWork,
     PostgresUnitOfWork,
     MockUnitOfWork,
@@ -20,8 +23,7 @@ class PostgresAccountRepository(AccountRepository):
     async def _find_by_id(self, entity_id: str) -> Account | None:
         row = await self.uow.conn.fetchrow(
             """
-            SELECT 
-                a.account_id, a.transactions, a.balance 
+            SELECT a.account_id, a.balance, a.version
             FROM accounting_accounts a WHERE account_id = $1
             """,
             entity_id,
@@ -30,52 +32,133 @@ class PostgresAccountRepository(AccountRepository):
         if not row:
             return None
 
-        transactions = [
-            Transaction(**transaction)
-            for transaction in json.loads(row["transactions"])
-        ]
+        return self.__account(row)
 
-        return Account(
-            account_id=row["account_id"],
-            transactions=transactions,
-            balance=int(row["balance"]),
+    async def _find_by_ids(self, entity_ids: list[str]) -> list[Account]:
+        rows = await self.uow.conn.fetch(
+            """
+            SELECT a.account_id, a.balance, a.version
+            FROM accounting_accounts a WHERE account_id = ANY($1)
+            ORDER BY account_id
+            """,
+            entity_ids,
         )
 
-    async def _add(self, entity: Account) -> None:
-        transactions = json.dumps(
-            [transaction.__dict__ for transaction in entity._transactions]
+        return [self.__account(row) for row in rows]
+
+    @staticmethod
+    def __account(row: Record) -> Account:
+        account = Account(account_id=row["account_id"], balance=int(row["balance"]))
+        account.mark_as_persisted(row["version"])
+
+        return account
+
+    async def load_transactions(
+        self, accounts: list[Account], idempotency_keys: list[str]
+    ) -> None:
+        rows = await self.uow.conn.fetch(
+            """
+            SELECT account_id, idempotency_key, amount, metadata
+            FROM accounting_ledger
+            WHERE account_id = ANY($1) AND idempotency_key = ANY($2)
+            """,
+            [account.account_id for account in accounts],
+            idempotency_keys,
         )
 
+        transactions: dict[str, list[Transaction]] = {}
+
+        for row in rows:
+            transactions.setdefault(row["account_id"], []).append(
+                Transaction(
+                    idempotency_key=row["idempotency_key"],
+                    amount=row["amount"],
+                    metadata=json.loads(row["metadata"]),
+                )
+            )
+
+        for account in accounts:
+            account.load_transactions(transactions.get(account.account_id, []))
+
+    async def _add(self, entity: Account) -> None:
         await self.uow.conn.execute(
             """
-            INSERT INTO accounting_accounts (account_id, transactions, balance)
+            WITH ledger AS (
+                INSERT INTO accounting_ledger (account_id, idempotency_key, amount, metadata)
+                SELECT $1::varchar, * FROM unnest($4::varchar[], $5::int[], $6::jsonb[])
+            )
+            INSERT INTO accounting_accounts (account_id, balance, version)
             VALUES ($1, $2, $3)
             """,
             entity.account_id,
-            transactions,
             entity.balance,
+            entity.version + 1,
+            *self.__ledger_columns(entity.new_transactions),
         )
 
     async def _update(self, entity: Account) -> None:
-        transactions = json.dumps(
-            [transaction.__dict__ for transaction in entity._transactions]
-        )
+        await self._update_many([entity])
 
-        await self.uow.conn.execute(
+    async def _update_many(self, entities: list[Account]) -> None:
+        new_transactions = [
+            (entity.account_id, transaction)
+            for entity in entities
+            for transaction in entity.new_transactions
+        ]
+
+        # New transactions are appended to the ledger, and balances move by the
+        # amount actually inserted, so a replayed transaction is never counted twice
+        rows = await self.uow.conn.fetch(
             """
-            UPDATE accounting_accounts
-            SET transactions = $2, balance = $3
-            WHERE account_id = $1
+            WITH inserted AS (
+                INSERT INTO accounting_ledger (account_id, idempotency_key, amount, metadata)
+                SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::int[], $4::jsonb[])
+                ON CONFLICT (account_id, idempotency_key) DO NOTHING
+                RETURNING account_id, amount
+            ),
+            deltas AS (
+                SELECT account_id, SUM(amount) AS amount FROM inserted GROUP BY account_id
+            )
+            UPDATE accounting_accounts a
+            SET balance = a.balance + COALESCE(d.amount, 0), version = u.version + 1
+            FROM unnest($5::varchar[], $6::int[]) AS u(account_id, version)
+            LEFT JOIN deltas d ON d.account_id = u.account_id
+            WHERE a.account_id = u.account_id AND a.version = u.version
+            RETURNING a.account_id
             """,
-            entity.account_id,
-            transactions,
-            entity.balance,
+            [account_id for account_id, _ in new_transactions],
+            *self.__ledger_columns(
+                [transaction for _, transaction in new_transactions]
+            ),
+            [entity.account_id for entity in entities],
+            [entity.version for entity in entities],
+        )
+
+        if len(rows) != len(entities):
+            updated = {row["account_id"] for row in rows}
+            raise ConcurrencyConflictError(
+                "Accounts changed concurrently: "
+                f"{[e.account_id for e in entities if e.account_id not in updated]}"
+            )
+
+    @staticmethod
+    def __ledger_columns(
+        transactions: list[Transaction],
+    ) -> tuple[list[str], list[int], list[str]]:
+        return (
+            [transaction.idempotency_key for transaction in transactions],
+            [transaction.amount for transaction in transactions],
+            [json.dumps(transaction.metadata) for transaction in transactions],
         )
 
 
 # Mock repository for tests
 class MockAccountRepository(AccountRepository, MockRepository[Account]):
-    pass
+    # Mock accounts are kept in memory along with their whole history
+    async def load_transactions(
+        self, accounts: list[Account], idempotency_keys: list[str]
+    ) -> None:
+        pass
 
 
 def account_repository(uow: UnitOfWork) -> AccountRepository:
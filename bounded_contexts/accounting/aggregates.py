@@ -21,8 +21,18 @@ class Account(Aggregate):
 
         self._balance = balance
 
+        # Not the whole history, only the transactions loaded on demand
+        # (see AccountRepository.load_transactions) and the new ones
         self._transactions = transactions if transactions else []
 
+        # Hashed, so duplicates are detected in constant time
+        self._idempotency_keys = {
+            transaction.idempotency_key for transaction in self._transactions
+        }
+
+        # Made since the account was loaded, appended to the ledger on persist
+        self._new_transactions: list[Transaction] = []
+
     @property
     def account_id(self) -> str:
         return self.entity_id
@@ -31,26 +41,43 @@ class Account(Aggregate):
     def balance(self) -> int:
         return self._balance
 
+    @property
+    def new_transactions(self) -> list[Transaction]:
+        return self._new_transactions
+
+    def load_transactions(self, transactions: list[Transaction]) -> None:
+        for transaction in transactions:
+            if transaction.idempotency_key not in self._idempotency_keys:
+                self._transactions.append(transaction)
+                self._idempotency_keys.add(transaction.idempotency_key)
+
+    def mark_as_persisted(self, version: int) -> None:
+        super().mark_as_persisted(version)
+        self._new_transactions = []
+
     def deposit(self, idempotency_key: str, amount: int, metadata: dict) -> None:
         # Ignore duplicate deposits
-        for previous_deposit in self._transactions:
-            if previous_deposit.idempotency_key == idempotency_key:
-                return
+        if idempotency_key in self._idempotency_keys:
+            return
 
-        self._transactions.append(Transaction(idempotency_key, amount, metadata))
-        self._balance += amount
+        self.__append(Transaction(idempotency_key, amount, metadata))
 
     def withdraw(self, idempotency_key: str, amount: int, metadata: dict) -> None:
         # Ignore duplicate withdrawals
-        for previous_withdrawal in self._transactions:
-            if previous_withdrawal.idempotency_key == idempotency_key:
-                return
+        if idempotency_key in self._idempotency_keys:
+            return
 
         if amount > self.balance:
             raise ValueError(f"Insufficient funds to withdraw '{amount}'")
 
-        self._transactions.append(Transaction(idempotency_key, -amount, metadata))
-        self._balance -= amount
+        self.__append(Transaction(idempotency_key, -amount, metadata))
+
+    def __append(self, transaction: Transaction) -> None:
+        self._transactions.append(transaction)
+        self._idempotency_keys.add(transaction.idempotency_key)
+        self._new_transactions.append(transaction)
+        self._balance += transaction.amount
+        self._mark_as_changed()
 
 
 def account_transfer(
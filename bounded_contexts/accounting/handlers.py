@@ -13,6 +13,8 @@ from bounded_contexts.accounting.messages import (
 )
 from bounded_contexts.auth.messages import SignupEvent
 from infrastructure.events.bus import event_bus
+from infrastructure.events.retry import CONTENDED_RETRY_POLICY
+from infrastructure.events.unit_of_work import UnitOfWork
 from infrastructure.events.uow_factory import make_unit_of_work
 
 
@@ -23,56 +25,76 @@ async def handle_account_created_event(event: SignupEvent) -> None:
         await account_repository(uow).add(account)
 
 
-async def handle_transfer(
-    command: RequestTransferCommand,
-) -> None:
-    async with make_unit_of_work() as uow:
-        initiator = await account_repository(uow).find_by_id(command.from_account_id)
-        recipient = await account_repository(uow).find_by_id(command.to_account_id)
+# Each account is loaded (and persisted) once, however many commands touch it,
+# along with the transactions of the given idempotency keys (to skip replays)
+async def load_accounts(
+    uow: UnitOfWork, account_ids: set[str], idempotency_keys: set[str]
+) -> dict[str, Account]:
+    found = await account_repository(uow).find_by_ids(account_ids)
+
+    assert len(found) == len(account_ids)
 
-        assert initiator and recipient
+    await account_repository(uow).load_transactions(found, list(idempotency_keys))
 
-        account_transfer(
-            idempotency_key=command.idempotency_key,
-            from_account=initiator,
-            to_account=recipient,
-            amount=command.amount,
-            metadata=command.metadata,
+    return {account.account_id: account for account in found}
+
+
+async def handle_transfers(
+    commands: list[RequestTransferCommand],
+) -> None:
+    async with make_unit_of_work() as uow:
+        accounts = await load_accounts(
+            uow,
+            {command.from_account_id for command in commands}
+            | {command.to_account_id for command in commands},
+            {command.idempotency_key for command in commands},
         )
 
-        uow.emit(
-            TransferSucceededEvent(
+        for command in commands:
+            account_transfer(
                 idempotency_key=command.idempotency_key,
-                from_account_id=command.from_account_id,
-                to_account_id=command.to_account_id,
+                from_account=accounts[command.from_account_id],
+                to_account=accounts[command.to_account_id],
                 amount=command.amount,
                 metadata=command.metadata,
             )
-        )
+
+            uow.emit(
+                TransferSucceededEvent(
+                    idempotency_key=command.idempotency_key,
+                    from_account_id=command.from_account_id,
+                    to_account_id=command.to_account_id,
+                    amount=command.amount,
+                    metadata=command.metadata,
+                ),
+                cause=command,
+            )
 
 
-async def handle_deposit(
-    command: DepositCommand,
+async def handle_deposits(
+    commands: list[DepositCommand],
 ) -> None:
     async with make_unit_of_work() as uow:
-        account = await account_repository(uow).find_by_id(command.account_id)
-
-        assert account
-
-        account.deposit(
-            idempotency_key=command.idempotency_key,
-            amount=command.amount,
-            metadata=command.metadata,
+        accounts = await load_accounts(
+            uow,
+            {command.account_id for command in commands},
+            {command.idempotency_key for command in commands},
         )
 
+        for command in commands:
+            accounts[command.account_id].deposit(
+                idempotency_key=command.idempotency_key,
+                amount=command.amount,
+                metadata=command.metadata,
+            )
+
 
 async def handle_withdraw_request(
     event: RequestWithdrawCommand,
 ) -> None:
     async with make_unit_of_work() as uow:
-        account = await account_repository(uow).find_by_id(event.account_id)
-
-        assert account
+        accounts = await load_accounts(uow, {event.account_id}, {event.idempotency_key})
+        account = accounts[event.account_id]
 
         try:
             account.withdraw(
@@ -104,14 +126,21 @@ async def handle_withdraw_request(
 def register_accounting_handlers() -> None:
     event_bus.register_event_handler(SignupEvent, handle_account_created_event)
 
-    event_bus.register_command_handler(
+    # Backlogs of these commands are handled in batches (see EventBus)
+    event_bus.register_batch_command_handler(
         RequestTransferCommand,
-        handle_transfer,
+        handle_transfers,
+        retry_policy=CONTENDED_RETRY_POLICY,
     )
 
-    event_bus.register_command_handler(
+    event_bus.register_batch_command_handler(
         DepositCommand,
-        handle_deposit,
+        handle_deposits,
+        retry_policy=CONTENDED_RETRY_POLICY,
     )
 
-    event_bus.register_command_handler(RequestWithdrawCommand, handle_withdraw_request)
+    event_bus.register_command_handler(
+        RequestWithdrawCommand,
+        handle_withdraw_request,
+        retry_policy=CONTENDED_RETRY_POLICY,
+    )
@@ -3,23 +3,31 @@ from dataclasses import dataclass
 from infrastructure.events.messages import Event, Command
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DepositCommand(Command):
     account_id: str
     idempotency_key: str
     amount: int
     metadata: dict
 
+    @property
+    def routing_key(self) -> str | None:
+        return self.account_id
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class RequestWithdrawCommand(Command):
     account_id: str
     idempotency_key: str
     amount: int
     metadata: dict
 
+    @property
+    def routing_key(self) -> str | None:
+        return self.account_id
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RequestTransferCommand(Command):
     idempotency_key: str
     from_account_id: str
@@ -27,8 +35,12 @@ class RequestTransferCommand(Command):
     amount: int
     metadata: dict
 
+    @property
+    def routing_key(self) -> str | None:
+        return self.to_account_id
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TransferSucceededEvent(Event):
     idempotency_key: str
     from_account_id: str
@@ -36,18 +48,30 @@ class TransferSucceededEvent(Event):
     amount: int
     metadata: dict
 
+    @property
+    def routing_key(self) -> str | None:
+        return self.to_account_id
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class WithdrawSucceededEvent(Event):
     account_id: str
     idempotency_key: str
     amount: int
     metadata: dict
 
+    @property
+    def routing_key(self) -> str | None:
+        return self.account_id
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class WithdrawRejectedEvent(Event):
     account_id: str
     idempotency_key: str
     amount: int
     metadata: dict
+
+    @property
+    def routing_key(self) -> str | None:
+        return self.account_id
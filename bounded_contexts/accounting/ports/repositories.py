@@ -1,4 +1,4 @@
-from abc import ABC
+from abc import ABC, abstractmethod
 
 from bounded_contexts.accounting.aggregates import Account
 from bounded_contexts.common.ports.repositories import Repository
@@ -6,4 +6,10 @@ from bounded_contexts.common.ports.repositories import Repository
 
 # Abstract repository
 class AccountRepository(Repository[Account], ABC):
-    pass
+    # Accounts are loaded without their history, so the transactions that
+    # deduplicate operations (by idempotency key) have to be loaded first
+    @abstractmethod
+    async def load_transactions(
+        self, accounts: list[Account], idempotency_keys: list[str]
+    ) -> None:
+        pass
@@ -1,3 +1,5 @@
+from asyncpg import Record
+
 from bounded_contexts.auth.aggregates import Account
 from bounded_contexts.auth.ports.repositories import AccountRepository
 from infrastructure.events.unit_of_work import UnitOfWork, PostgresUnitOfWork
@@ -19,6 +21,21 @@ class PostgresAccountRepository(AccountRepository):
         if row is None:
             return None
 
+        return self.__account(row)
+
+    async def _find_by_ids(self, entity_ids: list[str]) -> list[Account]:
+        rows = await self.uow.conn.fetch(
+            """
+            SELECT account_id, username, password FROM auth_accounts
+            WHERE account_id = ANY($1) ORDER BY account_id
+            """,
+            entity_ids,
+        )
+
+        return [self.__account(row) for row in rows]
+
+    @staticmethod
+    def __account(row: Record) -> Account:
         return Account(
             account_id=row["account_id"],
             username=row["username"],
@@ -3,13 +3,21 @@ from dataclasses import dataclass
 from infrastructure.events.messages import Command, Event
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RegisterAccount(Command):
     account_id: str
     username: str
     hashed_password: str
 
+    @property
+    def routing_key(self) -> str | None:
+        return self.account_id
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class SignupEvent(Event):
     account_id: str
+
+    @property
+    def routing_key(self) -> str | None:
+        return self.account_id
@@ -5,6 +5,17 @@ BTC_INVOICES_AGGREGATE_DDL = """
         payment_request VARCHAR,
         invoice_type VARCHAR,
         amount INT,
-        status VARCHAR
+        status VARCHAR,
+        version INT NOT NULL DEFAULT 1
     );
+
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'btc_invoices' AND column_name = 'version'
+        ) THEN
+            ALTER TABLE btc_invoices ADD COLUMN version INT NOT NULL DEFAULT 1;
+        END IF;
+    END $$;
     """
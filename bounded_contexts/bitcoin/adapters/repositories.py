@@ -1,6 +1,12 @@
+from asyncpg import Record
+
 from bounded_contexts.bitcoin.aggregates import BTCInvoice, InvoiceStatus, InvoiceType
 from bounded_contexts.bitcoin.ports.repositories import InvoiceRepository
-from infrastructure.events.unit_of_work import PostgresUnitOfWork, UnitOfWork
+from infrastructure.events.unit_of_work import (
+    ConcurrencyConflictError,
+    PostgresUnitOfWork,
+    UnitOfWork,
+)
 
 
 class PostgresInvoiceRepository(InvoiceRepository):
@@ -20,14 +26,7 @@ class PostgresInvoiceRepository(InvoiceRepository):
         if not row:
             return None
 
-        return BTCInvoice(
-            account_id=row["account_id"],
-            amount=int(row["amount"]),
-            status=InvoiceStatus(row["status"]),
-            payment_hash=row["payment_hash"],
-            payment_request=row["payment_request"],
-            invoice_type=InvoiceType(row["invoice_type"]),
-        )
+        return self.__invoice(row)
 
     async def _find_by_id(self, entity_id: str) -> BTCInvoice | None:
         row = await self.uow.conn.fetchrow(
@@ -40,7 +39,22 @@ class PostgresInvoiceRepository(InvoiceRepository):
         if not row:
             return None
 
-        return BTCInvoice(
+        return self.__invoice(row)
+
+    async def _find_by_ids(self, entity_ids: list[str]) -> list[BTCInvoice]:
+        rows = await self.uow.conn.fetch(
+            """
+            SELECT * FROM btc_invoices WHERE payment_hash = ANY($1)
+            ORDER BY payment_hash
+            """,
+            entity_ids,
+        )
+
+        return [self.__invoice(row) for row in rows]
+
+    @staticmethod
+    def __invoice(row: Record) -> BTCInvoice:
+        invoice = BTCInvoice(
             account_id=row["account_id"],
             amount=int(row["amount"]),
             status=InvoiceStatus(row["status"]),
@@ -48,13 +62,17 @@ class PostgresInvoiceRepository(InvoiceRepository):
             payment_request=row["payment_request"],
             invoice_type=InvoiceType(row["invoice_type"]),
         )
+        invoice.mark_as_persisted(row["version"])
+
+        return invoice
 
     async def _add(self, entity: BTCInvoice) -> None:
         await self.uow.conn.execute(
             """
             INSERT INTO btc_invoices (
-                account_id, amount, status, payment_hash, payment_request, invoice_type
-            ) VALUES ($1, $2, $3, $4, $5, $6)
+                account_id, amount, status, payment_hash, payment_request, invoice_type,
+                version
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7)
 
             """,
             entity._account_id,
@@ -63,19 +81,34 @@ class PostgresInvoiceRepository(InvoiceRepository):
             entity._payment_hash,
             entity._payment_request,
             entity._invoice_type,
+            entity.version + 1,
         )
 
     async def _update(self, entity: BTCInvoice) -> None:
-        await self.uow.conn.execute(
+        await self._update_many([entity])
+
+    async def _update_many(self, entities: list[BTCInvoice]) -> None:
+        rows = await self.uow.conn.fetch(
             """
-            UPDATE btc_invoices
-            SET status = $1
-            WHERE payment_hash = $2
+            UPDATE btc_invoices i
+            SET status = u.status, version = u.version + 1
+            FROM unnest($1::varchar[], $2::varchar[], $3::int[])
+                AS u(payment_hash, status, version)
+            WHERE i.payment_hash = u.payment_hash AND i.version = u.version
+            RETURNING i.payment_hash
             """,
-            entity._status.value,
-            entity.entity_id,
+            [entity.entity_id for entity in entities],
+            [entity._status.value for entity in entities],
+            [entity.version for entity in entities],
         )
 
+        if len(rows) != len(entities):
+            updated = {row["payment_hash"] for row in rows}
+            raise ConcurrencyConflictError(
+                "Invoices changed concurrently: "
+                f"{[e.entity_id for e in entities if e.entity_id not in updated]}"
+            )
+
 
 def invoice_repository(uow: UnitOfWork) -> InvoiceRepository:
     if isinstance(uow, PostgresUnitOfWork):
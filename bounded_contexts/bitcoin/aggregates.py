@@ -5,6 +5,9 @@ from bounded_contexts.common.aggregates import Aggregate
 
 class InvoiceStatus(StrEnum):
     PENDING = "PENDING"
+    # Withdrawal being paid, whether the payment went through is unknown
+    # until it's marked as paid
+    PAYING = "PAYING"
     PAID = "PAID"
     REJECTED = "REJECTED"
 
@@ -32,12 +35,18 @@ class BTCInvoice(Aggregate):
         self._payment_request = payment_request
         self._invoice_type = invoice_type
 
+    def mark_as_paying(self) -> None:
+        assert self._status == InvoiceStatus.PENDING
+        self._status = InvoiceStatus.PAYING
+        self._mark_as_changed()
+
     def mark_as_paid(self) -> None:
         if self._status == InvoiceStatus.PAID:
             return
 
-        assert self._status == InvoiceStatus.PENDING
+        assert self._status in (InvoiceStatus.PENDING, InvoiceStatus.PAYING)
         self._status = InvoiceStatus.PAID
+        self._mark_as_changed()
 
     def mark_as_rejected(self) -> None:
         if self._status == InvoiceStatus.REJECTED:
@@ -45,6 +54,7 @@ class BTCInvoice(Aggregate):
 
         assert self._status == InvoiceStatus.PENDING
         self._status = InvoiceStatus.REJECTED
+        self._mark_as_changed()
 
     @property
     def account_id(self) -> str:
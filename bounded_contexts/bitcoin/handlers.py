@@ -1,3 +1,5 @@
+import logging
+
 from bounded_contexts.accounting.messages import (
     RequestWithdrawCommand,
     WithdrawSucceededEvent,
@@ -12,8 +14,11 @@ from bounded_contexts.bitcoin.messages import (
     VerifyInvoice,
 )
 from infrastructure.events.bus import event_bus
+from infrastructure.events.retry import DEFAULT_RETRY_POLICY
 from infrastructure.events.uow_factory import make_unit_of_work
 
+logger = logging.getLogger(__name__)
+
 
 async def handle_create_invoice(command: CreateInvoice) -> None:
     async with make_unit_of_work() as uow:
@@ -85,13 +90,35 @@ async def handle_withdraw_accepted_event(event: WithdrawSucceededEvent) -> None:
     if payment_hash is None or payment_request is None:
         return
 
-    await btc_processor().pay_invoice(payment_request)
-
+    # The payment attempt is committed first (along with the inbox record,
+    # rejecting redeliveries of the event), so an invoice is never paid twice
     async with make_unit_of_work() as uow:
         invoice = await invoice_repository(uow).find_by_id(payment_hash)
         assert invoice
 
-        invoice.mark_as_paid()
+        if invoice.status != InvoiceStatus.PENDING:
+            return
+
+        invoice.mark_as_paying()
+
+    # Paid outside of any transaction. If the payment fails (or this process dies),
+    # the invoice is left as PAYING: whether it went through has to be checked
+    # before paying again
+    try:
+        await btc_processor().pay_invoice(payment_request)
+    except Exception:
+        logger.exception(f"Payment of invoice '{payment_hash}' failed, left as PAYING")
+        raise
+
+    async def mark_as_paid() -> None:
+        async with make_unit_of_work() as uow:
+            invoice = await invoice_repository(uow).find_by_id(payment_hash)
+            assert invoice
+
+            invoice.mark_as_paid()
+
+    # Retried on its own, running the whole handler again wouldn't get past the inbox
+    await DEFAULT_RETRY_POLICY.run(mark_as_paid)
 
 
 async def handle_withdraw_rejected_event(event: WithdrawRejectedEvent) -> None:
@@ -4,7 +4,7 @@ from bounded_contexts.bitcoin.aggregates import InvoiceType
 from infrastructure.events.messages import Command, Event
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CreateInvoice(Command):
     account_id: str
     payment_hash: str
@@ -12,7 +12,15 @@ class CreateInvoice(Command):
     amount: int
     invoice_type: InvoiceType
 
+    @property
+    def routing_key(self) -> str | None:
+        return self.payment_hash
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class VerifyInvoice(Command):
     payment_hash: str
+
+    @property
+    def routing_key(self) -> str | None:
+        return self.payment_hash
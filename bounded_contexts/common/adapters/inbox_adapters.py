@@ -0,0 +1,84 @@
+from bounded_contexts.common.ports.inbox import Inbox
+from infrastructure.events.unit_of_work import (
+    MockUnitOfWork,
+    PostgresUnitOfWork,
+    UnitOfWork,
+)
+from infrastructure.postgres import postgres_pool
+
+# Rows deleted per statement when purging the inbox
+PURGE_BATCH_SIZE = 10_000
+
+
+class PostgresInbox(Inbox):
+    def __init__(self, uow: PostgresUnitOfWork) -> None:
+        super().__init__(uow)
+        self.uow = uow
+
+    async def record(self, handler: str, message_ids: list[str]) -> list[str]:
+        # A concurrent delivery of the same message blocks on the primary key
+        # until this transaction ends, and is only recorded if it rolls back.
+        # Ids are inserted in order, so overlapping batches can't deadlock
+        rows = await self.uow.conn.fetch(
+            """
+            INSERT INTO inbox_messages (handler, message_id)
+            SELECT $1, message_id FROM unnest($2::varchar[]) AS m(message_id)
+            ON CONFLICT (handler, message_id) DO NOTHING
+            RETURNING message_id
+            """,
+            handler,
+            sorted(message_ids),
+        )
+
+        recorded = {row["message_id"] for row in rows}
+
+        return [message_id for message_id in message_ids if message_id not in recorded]
+
+
+# Mock inbox for tests
+class MockInbox(Inbox):
+    _records: set[tuple[str, str]] = set()
+
+    async def record(self, handler: str, message_ids: list[str]) -> list[str]:
+        duplicates = [
+            message_id
+            for message_id in message_ids
+            if (handler, message_id) in self._records
+        ]
+
+        if not duplicates:
+            self._records.update((handler, message_id) for message_id in message_ids)
+
+        return duplicates
+
+
+# Deletes the records older than the retention (in seconds), in small
+# batches, so the inbox doesn't keep growing with every processed message
+async def purge_inbox(retention: float) -> None:
+    async with postgres_pool.get_pool().acquire() as conn:
+        while True:
+            result = await conn.execute(
+                """
+                DELETE FROM inbox_messages
+                WHERE (handler, message_id) IN (
+                    SELECT handler, message_id FROM inbox_messages
+                    WHERE processed_at < NOW() - make_interval(secs => $1)
+                    LIMIT $2
+                )
+                """,
+                retention,
+                PURGE_BATCH_SIZE,
+            )
+
+            if int(result.split()[-1]) < PURGE_BATCH_SIZE:
+                return
+
+
+def inbox(uow: UnitOfWork) -> Inbox:
+    if isinstance(uow, PostgresUnitOfWork):
+        return PostgresInbox(uow)
+
+    if isinstance(uow, MockUnitOfWork):
+        return MockInbox(uow)
+
+    raise Exception("Unsupported UnitOfWork type.")
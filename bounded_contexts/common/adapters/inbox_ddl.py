@@ -0,0 +1,16 @@
+INBOX_DDL = """
+    CREATE TABLE IF NOT EXISTS inbox_messages (
+        handler VARCHAR NOT NULL,
+        message_id VARCHAR NOT NULL,
+        processed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (handler, message_id)
+    );
+
+    DO $$
+    BEGIN
+        IF to_regclass('inbox_messages_processed_at_idx') IS NULL THEN
+            CREATE INDEX inbox_messages_processed_at_idx
+            ON inbox_messages (processed_at);
+        END IF;
+    END $$;
+"""
@@ -1,90 +1,575 @@
 import asyncio
 import logging
-import pickle
-from asyncio import sleep
+import time
+from asyncio import FIRST_COMPLETED
+
+from asyncpg import Connection
 
 from bounded_contexts.common.ports.outbox import (
     TransactionalOutbox,
     TransactionalOutboxProcessor,
 )
+from bounded_contexts.common.adapters.inbox_adapters import purge_inbox
+from config.env import OutboxEnvironment, outbox_environment
 from infrastructure.events.bus import event_bus
+from infrastructure.events.codec import message_codec
+from infrastructure.events.lanes import Lane
 from infrastructure.events.messages import Message
 from infrastructure.events.unit_of_work import PostgresUnitOfWork, UnitOfWork
+from infrastructure.metrics import metrics_registry
 from infrastructure.postgres import postgres_pool
+from infrastructure.tools.background_utils import background_service
 
 logger = logging.getLogger(__name__)
 
+# Postgres channel notified every time a transaction stores outbox messages
+OUTBOX_CHANNEL = "outbox_messages"
+
+# Serializes the processors claiming messages (see _fetch_messages)
+OUTBOX_CLAIM_LOCK_KEY = 7_340_215_119
+
+# Dispatch throughput is the rate of the dispatched counter
+dispatched_counter = metrics_registry.counter(
+    "outbox_messages_dispatched_total",
+    "Outbox messages dispatched successfully",
+    ("message_type",),
+)
+failures_counter = metrics_registry.counter(
+    "outbox_dispatch_failures_total",
+    "Outbox message dispatches that failed",
+    ("message_type",),
+)
+dispatch_histogram = metrics_registry.histogram(
+    "outbox_dispatch_duration_seconds",
+    "Time spent dispatching outbox messages",
+    ("message_type",),
+)
+pending_gauge = metrics_registry.gauge(
+    "outbox_pending_messages",
+    "Messages waiting in the outbox",
+)
+oldest_age_gauge = metrics_registry.gauge(
+    "outbox_oldest_message_age_seconds",
+    "Age of the oldest message waiting in the outbox",
+)
+dead_letters_gauge = metrics_registry.gauge(
+    "outbox_dead_letters",
+    "Messages moved to the dead letters table",
+)
+
+
+async def collect_outbox_metrics() -> None:
+    async with postgres_pool.get_pool().acquire() as conn:
+        row = await conn.fetchrow(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM outbox_messages) AS pending,
+                (
+                    SELECT EXTRACT(EPOCH FROM NOW() - MIN(created_at))
+                    FROM outbox_messages
+                ) AS oldest_age,
+                (SELECT COUNT(*) FROM outbox_dead_letters) AS dead_letters
+            """
+        )
+
+    assert row
+
+    pending_gauge.set(row["pending"])
+    oldest_age_gauge.set(float(row["oldest_age"] or 0))
+    dead_letters_gauge.set(row["dead_letters"])
+
+
+metrics_registry.add_collector(collect_outbox_metrics)
+
+
+# Outbox processors running in this process (see process_outbox)
+running_processors = 0
+
 
 class PostgresTransactionalOutbox(TransactionalOutbox):
-    def __init__(self, uow: PostgresUnitOfWork) -> None:
+    def __init__(self, uow: PostgresUnitOfWork, config: OutboxEnvironment) -> None:
         super().__init__(uow)
         self.uow = uow
+        self.config = config
+
+        # Only processes running a processor dispatch their messages right after
+        # commit, so API processes without one (OUTBOX_EMBEDDED_PROCESSOR=false)
+        # leave every message to the workers, and stopped processors stop dispatching
+        self.immediate_dispatch = config.immediate_dispatch and running_processors > 0
+
+        # Messages stored already claimed, to be dispatched after commit
+        self.claimed_ids: set[str] = set()
 
     async def store(self, messages: list[Message]) -> None:
         if not messages:
             return
 
-        # TODO: Don't use pickle...
-        records = [(message.message_id, pickle.dumps(message)) for message in messages]
+        message_ids = [message.message_id for message in messages]
+        routing_keys = [message.routing_key for message in messages]
+        message_data = [message_codec.encode(message) for message in messages]
 
-        await self.uow.conn.executemany(
+        # Messages dispatched right after commit are stored already claimed,
+        # so processors only take them over if this process fails to dispatch them.
+        # Messages queued behind an earlier one of their routing key are left to
+        # the processors, which claim them in order (see _fetch_messages)
+        lease_seconds = self.config.lease_seconds if self.immediate_dispatch else None
+
+        # Notifications are only delivered when the transaction commits,
+        # so processors never wake up before the messages are visible
+        row = await self.uow.conn.fetchrow(
             """
-            INSERT INTO outbox_messages (message_id, message_data) 
-            VALUES ($1, $2)
-            ON CONFLICT (message_id) DO NOTHING
+            WITH m AS (
+                SELECT
+                    m.*,
+                    $4::float IS NOT NULL AND (
+                        m.routing_key IS NULL OR NOT EXISTS (
+                            SELECT 1 FROM outbox_messages e
+                            WHERE e.routing_key = m.routing_key
+                            AND e.message_id < m.message_id
+                        )
+                    ) AS claimed
+                FROM unnest($1::varchar[], $2::varchar[], $3::bytea[])
+                    AS m(message_id, routing_key, message_data)
+            ),
+            stored AS (
+                INSERT INTO outbox_messages (
+                    message_id, routing_key, message_data, locked_until
+                )
+                SELECT
+                    message_id, routing_key, message_data,
+                    CASE WHEN claimed THEN NOW() + make_interval(secs => $4) END
+                FROM m
+                ON CONFLICT (message_id) DO NOTHING
+            )
+            SELECT
+                array_agg(message_id) FILTER (WHERE claimed) AS claimed_ids,
+                CASE WHEN bool_or(NOT claimed) THEN pg_notify($5, '') END
+            FROM m
             """,
-            records,
+            message_ids,
+            routing_keys,
+            message_data,
+            lease_seconds,
+            OUTBOX_CHANNEL,
+        )
+
+        assert row
+        self.claimed_ids = set(row["claimed_ids"] or ())
+
+    def dispatch(self, messages: list[Message]) -> None:
+        claimed = [m for m in messages if m.message_id in self.claimed_ids]
+
+        if not claimed:
+            return
+
+        background_service.run_fire_forget_coroutine(
+            outbox_processor().process_claimed_messages(claimed)
         )
 
 
 class PostgresTransactionalOutboxProcessor(TransactionalOutboxProcessor):
+    def __init__(self, config: OutboxEnvironment) -> None:
+        self.config = config
+
     async def _fetch_messages(self) -> list[Message]:
-        async with postgres_pool.get_pool().acquire() as conn:
+        # Rows being claimed by other processors are skipped, and the lease
+        # lets the messages be claimed again if this processor dies mid-batch.
+        # Messages are skipped while an earlier one of their routing key is
+        # claimed or waiting for a retry, and claims are serialized so a routing
+        # key is never split between two processors
+        async with postgres_pool.get_pool().acquire() as conn, conn.transaction():
+            await conn.execute(
+                "SELECT pg_advisory_xact_lock($1)", OUTBOX_CLAIM_LOCK_KEY
+            )
+
             rows = await conn.fetch(
                 """
-                SELECT message_id, message_data
-                FROM outbox_messages
-            """
+                WITH claimed AS (
+                    UPDATE outbox_messages
+                    SET locked_until = NOW() + make_interval(secs => $2)
+                    WHERE message_id IN (
+                        SELECT message_id
+                        FROM outbox_messages m
+                        WHERE next_attempt_at <= NOW()
+                        AND (locked_until IS NULL OR locked_until < NOW())
+                        AND (
+                            routing_key IS NULL OR NOT EXISTS (
+                                SELECT 1 FROM outbox_messages e
+                                WHERE e.routing_key = m.routing_key
+                                AND e.message_id < m.message_id
+                                AND (
+                                    e.next_attempt_at > NOW()
+                                    OR e.locked_until >= NOW()
+                                )
+                            )
+                        )
+                        ORDER BY message_id
+                        LIMIT $1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING message_id, message_data
+                )
+                SELECT message_id, message_data FROM claimed ORDER BY message_id
+                """,
+                self.config.batch_size,
+                self.config.lease_seconds,
             )
 
-        return [self.__row_to_message(row) for row in rows]
+        messages: list[Message] = []
+        undecodable: list[tuple[str, str]] = []
+
+        for row in rows:
+            try:
+                messages.append(self.__row_to_message(row))
+            except Exception as exc:
+                undecodable.append((row["message_id"], self.__describe(exc)))
+
+        # Messages that can't even be decoded will never succeed
+        if undecodable:
+            logger.error(f"Undecodable outbox messages: {undecodable}")
+            await self.__record_failures(undecodable, give_up=True)
+
+        return messages
+
+    async def _dispatch_messages(
+        self, messages: list[Message]
+    ) -> tuple[list[tuple[Message, Exception]], list[tuple[Message, Message]]]:
+        # Messages with the same routing key are dispatched serially (in order),
+        # while different partitions run in parallel, up to max_concurrency
+        partitions: dict[str, list[Message]] = {}
 
-    async def _dispatch_messages(self, messages: list[Message]) -> None:
-        results = await asyncio.gather(
-            *[event_bus.handle(message) for message in messages],
-            return_exceptions=True,
+        for message in messages:
+            key = message.routing_key or message.message_id
+            partitions.setdefault(key, []).append(message)
+
+        semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        failures: list[tuple[Message, Exception]] = []
+        held_back: list[tuple[Message, Message]] = []
+
+        async def dispatch_partition(partition: list[Message]) -> None:
+            async with semaphore:
+                dispatched = 0
+
+                for batch in self.__batches(partition):
+                    # Batches failing as a whole are retried message by message,
+                    # so a single bad message doesn't hold back the ones before it
+                    if len(batch) > 1 and await self.__dispatch(batch):
+                        dispatched += len(batch)
+                        continue
+
+                    for message in batch:
+                        # The rest of the partition waits for the failed message,
+                        # so messages are never handled out of order
+                        if not await self.__dispatch([message], failures):
+                            held_back.extend(
+                                (later, message)
+                                for later in partition[dispatched + 1 :]
+                            )
+                            return
+
+                        dispatched += 1
+
+        await asyncio.gather(
+            *[dispatch_partition(partition) for partition in partitions.values()]
         )
 
-        exceptions = [result for result in results if isinstance(result, Exception)]
-        if exceptions:
-            for exc in exceptions:
-                logger.error(f"Error processing message: {exc}")
+        return failures, held_back
+
+    async def __dispatch(
+        self,
+        messages: list[Message],
+        failures: list[tuple[Message, Exception]] | None = None,
+    ) -> bool:
+        message_type = type(messages[0]).__name__
+        start = time.perf_counter()
+
+        try:
+            await event_bus.handle_batch(
+                messages, deduplicate=True, lane=Lane.BACKGROUND
+            )
+            dispatched_counter.inc(message_type, amount=len(messages))
+            return True
+
+        except Exception as exc:
+            logger.error(f"Error processing {len(messages)} message(s): {exc}")
+
+            if failures is not None:
+                failures.extend((message, exc) for message in messages)
+                failures_counter.inc(message_type, amount=len(messages))
+
+            return False
+
+        finally:
+            dispatch_histogram.observe(time.perf_counter() - start, message_type)
+
+    # Consecutive messages of a type with batch handlers are dispatched together
+    @staticmethod
+    def __batches(partition: list[Message]) -> list[list[Message]]:
+        batches: list[list[Message]] = []
 
+        for message in partition:
+            if (
+                batches
+                and type(batches[-1][0]) is type(message)
+                and event_bus.handles_batches(type(message))
+            ):
+                batches[-1].append(message)
+            else:
+                batches.append([message])
+
+        return batches
+
+    # Processed partitions end up empty, and are dropped (see maintain_outbox_partitions)
     async def _destroy_messages(self, messages: list[Message]) -> None:
         async with postgres_pool.get_pool().acquire() as conn:
             await conn.execute(
                 """
                 DELETE FROM outbox_messages WHERE message_id = ANY($1)
                 """,
-                [message.message_id for message in messages],  # type: ignore
+                [message.message_id for message in messages],
+            )
+
+    async def _reschedule_messages(
+        self,
+        failures: list[tuple[Message, Exception]],
+        held_back: list[tuple[Message, Message]],
+    ) -> None:
+        errors = [
+            (message.message_id, self.__describe(exc)) for message, exc in failures
+        ]
+
+        await self.__record_failures(
+            errors,
+            give_up=False,
+            held_back=[
+                (message.message_id, failed.message_id) for message, failed in held_back
+            ],
+        )
+
+    async def __record_failures(
+        self,
+        errors: list[tuple[str, str]],
+        give_up: bool,
+        held_back: list[tuple[str, str]] | None = None,
+    ) -> None:
+        message_ids = [message_id for message_id, _ in errors]
+
+        async with postgres_pool.get_pool().acquire() as conn, conn.transaction():
+            # Exponential backoff (with jitter), and release the claim
+            await conn.execute(
+                """
+                UPDATE outbox_messages
+                SET
+                    attempts = CASE
+                        WHEN $5 THEN GREATEST(attempts + 1, $6) ELSE attempts + 1
+                    END,
+                    last_error = f.error,
+                    locked_until = NULL,
+                    next_attempt_at = NOW() + make_interval(
+                        secs => LEAST($3 * 2 ^ attempts, $4) * (0.5 + random() / 2)
+                    )
+                FROM unnest($1::varchar[], $2::varchar[]) AS f(message_id, error)
+                WHERE outbox_messages.message_id = f.message_id
+                """,
+                message_ids,
+                [error for _, error in errors],
+                self.config.retry_base_delay,
+                self.config.retry_max_delay,
+                give_up,
+                self.config.max_attempts,
+            )
+
+            # Held back messages are released without counting an attempt, and
+            # become due along with the failed message (claimed first, by id)
+            if held_back:
+                await conn.execute(
+                    """
+                    UPDATE outbox_messages
+                    SET
+                        locked_until = NULL,
+                        next_attempt_at = COALESCE(f.next_attempt_at, NOW())
+                    FROM unnest($1::varchar[], $2::varchar[]) AS h(message_id, failed_id)
+                    LEFT JOIN outbox_messages f ON f.message_id = h.failed_id
+                    WHERE outbox_messages.message_id = h.message_id
+                    """,
+                    [message_id for message_id, _ in held_back],
+                    [failed_id for _, failed_id in held_back],
+                )
+
+            # Poison messages are moved to the dead letters table
+            await conn.execute(
+                """
+                WITH dead AS (
+                    DELETE FROM outbox_messages
+                    WHERE message_id = ANY($1) AND attempts >= $2
+                    RETURNING message_id, created_at, message_data, attempts, last_error
+                )
+                INSERT INTO outbox_dead_letters (
+                    message_id, created_at, message_data, attempts, last_error
+                )
+                SELECT * FROM dead
+                ON CONFLICT (message_id) DO NOTHING
+                """,
+                message_ids,
+                self.config.max_attempts,
             )
 
+    @staticmethod
+    def __describe(exc: Exception) -> str:
+        return f"{type(exc).__name__}: {exc}"
+
     def __row_to_message(self, row: dict) -> Message:
         message_data = row["message_data"]
-        return pickle.loads(message_data)
+        return message_codec.decode(message_data)
 
 
 def outbox(uow: UnitOfWork) -> TransactionalOutbox:
     assert isinstance(uow, PostgresUnitOfWork)
-    return PostgresTransactionalOutbox(uow)
+    return PostgresTransactionalOutbox(uow, outbox_environment)
 
 
 def outbox_processor() -> TransactionalOutboxProcessor:
-    return PostgresTransactionalOutboxProcessor()
+    return PostgresTransactionalOutboxProcessor(outbox_environment)
+
+
+async def listen_outbox(wakeup: asyncio.Event) -> Connection:
+    conn = await postgres_pool.connect()
+    await conn.add_listener(OUTBOX_CHANNEL, lambda *_: wakeup.set())
+
+    return conn
+
+
+async def wait_for_wakeup(
+    wakeup: asyncio.Event, stop: asyncio.Event, timeout: float
+) -> None:
+    waiters = [
+        asyncio.create_task(wakeup.wait()),
+        asyncio.create_task(stop.wait()),
+    ]
+
+    try:
+        await asyncio.wait(waiters, timeout=timeout, return_when=FIRST_COMPLETED)
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+
+
+# Time ordered ids starting at the given unix timestamp (in milliseconds)
+def partition_bound(timestamp_ms: int) -> str:
+    return f"{timestamp_ms << 80:032x}"
+
+
+# Creates the partitions of the current and next intervals, and drops the
+# past ones once empty: processed messages go away with their whole partition,
+# instead of leaving dead rows to vacuum. Failed steps are retried next time
+# (partitions are created ahead, and messages out of them go to the default one)
+async def maintain_outbox_partitions(interval: float) -> None:
+    interval_ms = int(interval * 1000)
+    current = int(time.time() * 1000) // interval_ms * interval_ms
 
+    async with postgres_pool.get_pool().acquire() as conn:
+        rows = await conn.fetch(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'outbox_messages'::regclass
+            """
+        )
+
+    existing = {row["relname"] for row in rows}
+
+    for start in range(current, current + 3 * interval_ms, interval_ms):
+        if f"outbox_messages_p{start}" not in existing:
+            await run_partition_ddl(
+                f"""
+                CREATE TABLE IF NOT EXISTS outbox_messages_p{start}
+                PARTITION OF outbox_messages FOR VALUES
+                FROM ('{partition_bound(start)}')
+                TO ('{partition_bound(start + interval_ms)}')
+                """,
+            )
+
+    for name in existing:
+        suffix = name.removeprefix("outbox_messages_p")
+
+        # Late messages (i.e. from long transactions) may still land in
+        # a past partition, so emptiness is checked under the table lock
+        if suffix.isdigit() and int(suffix) < current:
+            await run_partition_ddl(
+                f"""
+                DO $$
+                BEGIN
+                    LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE;
+
+                    IF NOT EXISTS (SELECT 1 FROM {name}) THEN
+                        DROP TABLE {name};
+                    END IF;
+                END $$
+                """,
+            )
+
+
+# Partition DDLs lock the whole outbox, so they give up instead of queuing
+# behind (and blocking) the transactions using it
+async def run_partition_ddl(ddl: str) -> None:
+    try:
+        async with postgres_pool.get_pool().acquire() as conn, conn.transaction():
+            await conn.execute("SET LOCAL lock_timeout = '500ms'")
+            await conn.execute(ddl)
+
+    except Exception as exc:
+        logger.warning(f"Outbox partition maintenance failed: {exc}")
+
+
+# Processes the outbox until stop is set, letting the in-flight batch finish
+async def process_outbox(stop: asyncio.Event) -> None:
+    global running_processors
 
-async def process_outbox() -> None:
     processor = outbox_processor()
-    while True:
-        await processor.process_messages()
-        await sleep(0.1)
+    wakeup = asyncio.Event()
+
+    # Dedicated connection, woken up by the transactions that store messages
+    listener: Connection | None = None
+
+    next_maintenance = 0.0
+
+    running_processors += 1
+
+    try:
+        while not stop.is_set():
+            wakeup.clear()
+
+            try:
+                if listener is None or listener.is_closed():
+                    listener = await listen_outbox(wakeup)
+
+                if time.monotonic() >= next_maintenance:
+                    next_maintenance = (
+                        time.monotonic() + outbox_environment.partition_interval / 4
+                    )
+                    await maintain_outbox_partitions(
+                        outbox_environment.partition_interval
+                    )
+                    await purge_inbox(outbox_environment.inbox_retention)
+
+                # Keep draining while batches come back full
+                while (
+                    not stop.is_set()
+                    and await processor.process_messages()
+                    >= outbox_environment.batch_size
+                ):
+                    pass
+
+            except Exception as exc:
+                logger.error(f"Error processing outbox: {exc}")
+
+            # Slow fallback poll, in case a notification is ever missed
+            await wait_for_wakeup(
+                wakeup, stop, outbox_environment.fallback_poll_interval
+            )
+    finally:
+        running_processors -= 1
+
+        if listener is not None:
+            await listener.close()
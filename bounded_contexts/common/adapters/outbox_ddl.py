@@ -1,7 +1,93 @@
 OUTBOX_DDL = """
+    -- The outbox used to be a plain table, it's moved aside (and copied below)
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM pg_class
+            WHERE relname = 'outbox_messages' AND relkind = 'r'
+        ) THEN
+            -- Columns added to the plain table over time
+            ALTER TABLE outbox_messages
+                ADD COLUMN IF NOT EXISTS locked_until TIMESTAMPTZ,
+                ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0,
+                ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                ADD COLUMN IF NOT EXISTS last_error VARCHAR;
+
+            ALTER TABLE outbox_messages RENAME TO outbox_messages_unpartitioned;
+            ALTER INDEX outbox_messages_pkey RENAME TO outbox_messages_unpartitioned_pkey;
+            DROP INDEX IF EXISTS outbox_messages_next_attempt_at_idx;
+            DROP INDEX IF EXISTS outbox_messages_created_at_idx;
+        END IF;
+    END $$;
+
+    -- Partitioned by (time ordered) id, so fully processed time ranges are
+    -- dropped whole (see maintain_outbox_partitions). The default partition
+    -- takes any message outside of the existing ranges
     CREATE TABLE IF NOT EXISTS outbox_messages (
         message_id varchar PRIMARY KEY,
+        routing_key varchar,
         created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-        message_data bytea NOT NULL
+        message_data bytea NOT NULL,
+        locked_until TIMESTAMPTZ,
+        attempts INT NOT NULL DEFAULT 0,
+        next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        last_error VARCHAR
+    ) PARTITION BY RANGE (message_id);
+
+    CREATE TABLE IF NOT EXISTS outbox_messages_default
+    PARTITION OF outbox_messages DEFAULT;
+
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'outbox_messages' AND column_name = 'routing_key'
+        ) THEN
+            ALTER TABLE outbox_messages ADD COLUMN routing_key varchar;
+        END IF;
+
+        IF to_regclass('outbox_messages_next_attempt_at_idx') IS NULL THEN
+            CREATE INDEX outbox_messages_next_attempt_at_idx
+            ON outbox_messages (next_attempt_at);
+        END IF;
+
+        IF to_regclass('outbox_messages_created_at_idx') IS NULL THEN
+            CREATE INDEX outbox_messages_created_at_idx
+            ON outbox_messages (created_at);
+        END IF;
+
+        -- Looks up the earlier messages of a routing key (see _fetch_messages)
+        IF to_regclass('outbox_messages_routing_key_idx') IS NULL THEN
+            CREATE INDEX outbox_messages_routing_key_idx
+            ON outbox_messages (routing_key, message_id);
+        END IF;
+    END $$;
+
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM pg_class WHERE relname = 'outbox_messages_unpartitioned'
+        ) THEN
+            INSERT INTO outbox_messages (
+                message_id, created_at, message_data, locked_until, attempts,
+                next_attempt_at, last_error
+            )
+            SELECT
+                message_id, created_at, message_data, locked_until, attempts,
+                next_attempt_at, last_error
+            FROM outbox_messages_unpartitioned
+            ON CONFLICT (message_id) DO NOTHING;
+
+            DROP TABLE outbox_messages_unpartitioned;
+        END IF;
+    END $$;
+
+    CREATE TABLE IF NOT EXISTS outbox_dead_letters (
+        message_id varchar PRIMARY KEY,
+        created_at TIMESTAMPTZ NOT NULL,
+        failed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        message_data bytea NOT NULL,
+        attempts INT NOT NULL,
+        last_error VARCHAR
     );
 """
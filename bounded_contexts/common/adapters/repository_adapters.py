@@ -8,6 +8,13 @@ class MockRepository[T: Aggregate](Repository):
     async def _find_by_id(self, entity_id: str) -> T | None:
         return self._entities.get(entity_id)
 
+    async def _find_by_ids(self, entity_ids: list[str]) -> list[T]:
+        return [
+            self._entities[entity_id]
+            for entity_id in entity_ids
+            if entity_id in self._entities
+        ]
+
     async def _add(self, entity: T) -> None:
         self._entities[entity.entity_id] = entity
 
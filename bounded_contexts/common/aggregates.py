@@ -6,10 +6,33 @@ class Aggregate(ABC):
     def __init__(self, entity_id: str) -> None:
         self.__entity_id = entity_id
 
+        # Set by the methods changing the aggregate, so repositories only
+        # write the aggregates that actually changed
+        self.__has_changes = False
+
+        # Version of the aggregate in storage (0 until stored). Writes only
+        # succeed if the stored version didn't change since it was loaded
+        self.__version = 0
+
     @property
     def entity_id(self) -> str:
         return self.__entity_id
 
+    @property
+    def version(self) -> int:
+        return self.__version
+
+    @property
+    def has_changes(self) -> bool:
+        return self.__has_changes
+
+    def _mark_as_changed(self) -> None:
+        self.__has_changes = True
+
+    def mark_as_persisted(self, version: int) -> None:
+        self.__has_changes = False
+        self.__version = version
+
     def __eq__(self, other) -> bool:
         if not isinstance(other, Aggregate):
             return False
@@ -0,0 +1,15 @@
+from abc import ABC, abstractmethod
+
+from infrastructure.events.unit_of_work import UnitOfWork
+
+
+# Records which messages each handler already processed, in the same
+# transaction as the handler's changes, so redeliveries can be rejected
+class Inbox(ABC):
+    def __init__(self, uow: UnitOfWork) -> None:
+        self.__uow = uow
+
+    # Returns the messages already processed by the handler, if any
+    @abstractmethod
+    async def record(self, handler: str, message_ids: list[str]) -> list[str]:
+        pass
@@ -12,23 +12,63 @@ class TransactionalOutbox(ABC):
     async def store(self, messages: list[Message]) -> None:
         pass
 
+    # Called once the transaction storing the messages has committed
+    @abstractmethod
+    def dispatch(self, messages: list[Message]) -> None:
+        pass
+
 
 class TransactionalOutboxProcessor(ABC):
-    async def process_messages(self) -> None:
+    # Returns the amount of processed messages
+    async def process_messages(self) -> int:
         messages = await self._fetch_messages()
 
-        await self._dispatch_messages(messages)
+        await self.process_claimed_messages(messages)
+
+        return len(messages)
+
+    # Dispatches messages already claimed by this processor
+    async def process_claimed_messages(self, messages: list[Message]) -> None:
+        if not messages:
+            return
+
+        failures, held_back = await self._dispatch_messages(messages)
 
-        await self._destroy_messages(messages)
+        # Failed (and held back) messages are kept and retried later,
+        # the rest are done
+        kept_ids = {message.message_id for message, _ in failures}
+        kept_ids.update(message.message_id for message, _ in held_back)
+        dispatched = [m for m in messages if m.message_id not in kept_ids]
 
+        if dispatched:
+            await self._destroy_messages(dispatched)
+
+        if failures:
+            await self._reschedule_messages(failures, held_back)
+
+    # Claims a bounded batch of messages, so several processors can run in parallel
     @abstractmethod
     async def _fetch_messages(self) -> list[Message]:
         pass
 
+    # Returns the messages that failed, along with their error, and the ones
+    # held back (not dispatched) behind a failed message, along with it
     @abstractmethod
-    async def _dispatch_messages(self, messages: list[Message]) -> None:
+    async def _dispatch_messages(
+        self, messages: list[Message]
+    ) -> tuple[list[tuple[Message, Exception]], list[tuple[Message, Message]]]:
         pass
 
     @abstractmethod
     async def _destroy_messages(self, messages: list[Message]) -> None:
         pass
+
+    # Schedules failed messages for a later attempt (or gives up on them),
+    # and the messages held back to run right after them
+    @abstractmethod
+    async def _reschedule_messages(
+        self,
+        failures: list[tuple[Message, Exception]],
+        held_back: list[tuple[Message, Message]],
+    ) -> None:
+        pass
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Iterable, cast
 
 from bounded_contexts.common.aggregates import Aggregate
 from infrastructure.events.unit_of_work import UnitOfWork
@@ -11,9 +12,31 @@ class Repository[T: Aggregate](ABC):
         self.__uow = uow
 
     def __track_object(self, obj: T) -> None:
-        self.__uow.track_object(obj, lambda: self._update(obj))
+        self.__uow.track_object(type(self), obj.entity_id, obj, self.__persist)
+
+    # Unchanged aggregates (i.e. only read, or idempotent no-ops) aren't written
+    async def __persist(self, objs: list[T]) -> None:
+        changed = [obj for obj in objs if obj.has_changes]
+
+        if not changed:
+            return
+
+        # Sorted, so concurrent transactions tend to lock rows in the same order
+        changed.sort(key=lambda obj: obj.entity_id)
+
+        # Writes store the next version, failing if another transaction did first
+        await self._update_many(changed)
+
+        for obj in changed:
+            obj.mark_as_persisted(self._updated_version(obj))
 
     async def find_by_id(self, entity_id: str) -> T | None:
+        # Objects already loaded in the unit of work are returned as they are
+        tracked = self.__uow.tracked_object(type(self), entity_id)
+
+        if tracked is not None:
+            return cast(T, tracked)
+
         obj = await self._find_by_id(entity_id)
 
         if obj is not None:
@@ -21,18 +44,58 @@ class Repository[T: Aggregate](ABC):
 
         return obj
 
+    # Missing entities are left out, and the others are returned sorted by id,
+    # so concurrent transactions touch (and lock) them in the same order
+    async def find_by_ids(self, entity_ids: Iterable[str]) -> list[T]:
+        entity_ids = sorted(set(entity_ids))
+        objs: dict[str, T] = {}
+        missing: list[str] = []
+
+        for entity_id in entity_ids:
+            tracked = self.__uow.tracked_object(type(self), entity_id)
+
+            if tracked is not None:
+                objs[entity_id] = cast(T, tracked)
+            else:
+                missing.append(entity_id)
+
+        if missing:
+            for obj in await self._find_by_ids(missing):
+                self.__track_object(obj)
+                objs[obj.entity_id] = obj
+
+        return [objs[entity_id] for entity_id in entity_ids if entity_id in objs]
+
     async def add(self, entity: T) -> None:
         await self._add(entity)
+        entity.mark_as_persisted(entity.version + 1)
         self.__track_object(entity)
 
     @abstractmethod
     async def _find_by_id(self, entity_id: str) -> T | None:
         pass
 
+    # Repositories can override this to fetch all the entities in one query
+    async def _find_by_ids(self, entity_ids: list[str]) -> list[T]:
+        objs = [await self._find_by_id(entity_id) for entity_id in entity_ids]
+
+        return [obj for obj in objs if obj is not None]
+
     @abstractmethod
     async def _add(self, entity: T) -> None:
         pass
 
+    # Stores the next version (entity.version + 1), raising
+    # ConcurrencyConflictError if the stored version isn't entity.version
     @abstractmethod
     async def _update(self, entity: T) -> None:
         pass
+
+    # Version stored by _update_many (the next one, unless the row is left as is)
+    def _updated_version(self, entity: T) -> int:
+        return entity.version + 1
+
+    # Repositories can override this to write all the entities in one statement
+    async def _update_many(self, entities: list[T]) -> None:
+        for entity in entities:
+            await self._update(entity)
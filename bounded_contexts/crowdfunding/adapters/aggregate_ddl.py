@@ -6,6 +6,63 @@ CAMPAIGN_AGGREGATE_DDL = """
         description VARCHAR,
         goal INT,
         total_raised INT,
-        donations JSONB
+        version INT NOT NULL DEFAULT 1,
+        shard_count INT NOT NULL DEFAULT 1
     );
+
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'campaigns' AND column_name = 'version'
+        ) THEN
+            ALTER TABLE campaigns ADD COLUMN version INT NOT NULL DEFAULT 1;
+        END IF;
+    END $$;
+
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'campaigns' AND column_name = 'shard_count'
+        ) THEN
+            ALTER TABLE campaigns ADD COLUMN shard_count INT NOT NULL DEFAULT 1;
+        END IF;
+    END $$;
+
+    -- Donations to sharded campaigns add up here, not in campaigns.total_raised
+    CREATE TABLE IF NOT EXISTS campaign_raised_shards (
+        campaign_id VARCHAR NOT NULL,
+        shard INT NOT NULL,
+        amount INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (campaign_id, shard)
+    );
+
+    DROP VIEW IF EXISTS campaign_raised_totals;
+
+    CREATE TABLE IF NOT EXISTS campaign_donations (
+        campaign_id VARCHAR NOT NULL,
+        idempotency_key VARCHAR NOT NULL,
+        account_id VARCHAR NOT NULL,
+        amount INT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (campaign_id, idempotency_key)
+    );
+
+    -- Donations used to be stored in a JSONB column of the campaigns
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'campaigns' AND column_name = 'donations'
+        ) THEN
+            INSERT INTO campaign_donations (campaign_id, idempotency_key, account_id, amount)
+            SELECT c.entity_id, d->>'idempotency_key', d->>'account_id', (d->>'amount')::int
+            FROM campaigns c, jsonb_array_elements(c.donations) d
+            WHERE c.donations IS NOT NULL
+            ON CONFLICT (campaign_id, idempotency_key) DO NOTHING;
+
+            ALTER TABLE campaigns DROP COLUMN donations;
+        END IF;
+    END $$;
     """
@@ -1,14 +1,30 @@
-import json
+import random
+
+from asyncpg import Record
 
 from bounded_contexts.common.adapters.repository_adapters import MockRepository
 from bounded_contexts.crowdfunding.aggregates import Campaign, Donation
 from bounded_contexts.crowdfunding.ports.repositories import CampaignRepository
 from infrastructure.events.unit_of_work import (
+    ConcurrencyConflictError,
     PostgresUnitOfWork,
     UnitOfWork,
     MockUnitOfWork,
 )
 
+# The total raised by sharded campaigns includes the sum of their shards
+SELECT_CAMPAIGNS = """
+    SELECT
+        c.entity_id, c.account_id, c.title, c.description, c.goal,
+        c.total_raised + COALESCE(r.amount, 0) AS total_raised,
+        c.version, c.shard_count
+    FROM campaigns c
+    LEFT JOIN LATERAL (
+        SELECT SUM(s.amount) AS amount
+        FROM campaign_raised_shards s WHERE s.campaign_id = c.entity_id
+    ) r ON true
+    """
+
 
 class PostgresCampaignRepository(CampaignRepository):
 
@@ -18,36 +34,79 @@ class PostgresCampaignRepository(CampaignRepository):
 
     async def _find_by_id(self, entity_id: str) -> Campaign | None:
         row = await self.uow.conn.fetchrow(
-            """
-            SELECT * FROM campaigns WHERE entity_id = $1
-            """,
+            f"{SELECT_CAMPAIGNS} WHERE c.entity_id = $1",
             entity_id,
         )
 
         if not row:
             return None
 
-        donations = [Donation(**donation) for donation in json.loads(row["donations"])]
+        return self.__campaign(row)
+
+    async def _find_by_ids(self, entity_ids: list[str]) -> list[Campaign]:
+        rows = await self.uow.conn.fetch(
+            f"{SELECT_CAMPAIGNS} WHERE c.entity_id = ANY($1) ORDER BY c.entity_id",
+            entity_ids,
+        )
+
+        return [self.__campaign(row) for row in rows]
 
-        return Campaign(
+    @staticmethod
+    def __campaign(row: Record) -> Campaign:
+        campaign = Campaign(
             entity_id=row["entity_id"],
             account_id=row["account_id"],
             title=row["title"],
             description=row["description"],
             goal=row["goal"],
             total_raised=row["total_raised"],
-            donations=donations,
+            shard_count=row["shard_count"],
         )
+        campaign.mark_as_persisted(row["version"])
 
-    async def _add(self, campaign: Campaign) -> None:
-        donations = json.dumps([donation.__dict__ for donation in campaign._donations])
+        return campaign
 
+    async def load_donations(
+        self, campaigns: list[Campaign], idempotency_keys: list[str]
+    ) -> None:
+        rows = await self.uow.conn.fetch(
+            """
+            SELECT campaign_id, idempotency_key, account_id, amount
+            FROM campaign_donations
+            WHERE campaign_id = ANY($1) AND idempotency_key = ANY($2)
+            """,
+            [campaign.entity_id for campaign in campaigns],
+            idempotency_keys,
+        )
+
+        donations: dict[str, list[Donation]] = {}
+
+        for row in rows:
+            donations.setdefault(row["campaign_id"], []).append(
+                Donation(
+                    idempotency_key=row["idempotency_key"],
+                    amount=row["amount"],
+                    account_id=row["account_id"],
+                )
+            )
+
+        for campaign in campaigns:
+            campaign.load_donations(donations.get(campaign.entity_id, []))
+
+    async def _add(self, campaign: Campaign) -> None:
         await self.uow.conn.execute(
             """
+            WITH donations AS (
+                INSERT INTO campaign_donations (
+                    campaign_id, idempotency_key, account_id, amount
+                )
+                SELECT $1::varchar, *
+                FROM unnest($9::varchar[], $10::varchar[], $11::int[])
+            )
             INSERT INTO campaigns (
-                entity_id, account_id, title, description, goal, total_raised, donations
-            ) VALUES ($1, $2, $3, $4, $5, $6, $7)
-
+                entity_id, account_id, title, description, goal, total_raised, version,
+                shard_count
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
             """,
             campaign.entity_id,
             campaign.account_id,
@@ -55,30 +114,136 @@ class PostgresCampaignRepository(CampaignRepository):
             campaign.description,
             campaign.goal,
             campaign.total_raised,
-            donations,
+            campaign.version + 1,
+            campaign.shard_count,
+            *self.__donation_columns(campaign.new_donations),
         )
 
     async def _update(self, campaign: Campaign) -> None:
-        donations = json.dumps([donation.__dict__ for donation in campaign._donations])
+        await self._update_many([campaign])
+
+    # Donations to sharded campaigns leave the campaign row (and version) as is
+    def _updated_version(self, campaign: Campaign) -> int:
+        if campaign.shard_count > 1:
+            return campaign.version
+
+        return campaign.version + 1
+
+    async def _update_many(self, campaigns: list[Campaign]) -> None:
+        sharded = [campaign for campaign in campaigns if campaign.shard_count > 1]
+        campaigns = [campaign for campaign in campaigns if campaign.shard_count == 1]
+
+        if sharded:
+            await self.__add_to_shards(sharded)
+
+        if not campaigns:
+            return
+
+        new_donations = [
+            (campaign.entity_id, donation)
+            for campaign in campaigns
+            for donation in campaign.new_donations
+        ]
+
+        # New donations are inserted, and totals move by the amount actually
+        # inserted, so a replayed donation is never counted twice
+        rows = await self.uow.conn.fetch(
+            """
+            WITH inserted AS (
+                INSERT INTO campaign_donations (
+                    campaign_id, idempotency_key, account_id, amount
+                )
+                SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::varchar[], $4::int[])
+                ON CONFLICT (campaign_id, idempotency_key) DO NOTHING
+                RETURNING campaign_id, amount
+            ),
+            deltas AS (
+                SELECT campaign_id, SUM(amount) AS amount FROM inserted GROUP BY campaign_id
+            )
+            UPDATE campaigns c
+            SET account_id = u.account_id, goal = u.goal, title = u.title,
+                description = u.description,
+                total_raised = c.total_raised + COALESCE(d.amount, 0),
+                version = u.version + 1
+            FROM unnest(
+                $5::varchar[], $6::varchar[], $7::int[],
+                $8::varchar[], $9::varchar[], $10::int[]
+            ) AS u(entity_id, account_id, goal, title, description, version)
+            LEFT JOIN deltas d ON d.campaign_id = u.entity_id
+            WHERE c.entity_id = u.entity_id AND c.version = u.version
+            RETURNING c.entity_id
+            """,
+            [campaign_id for campaign_id, _ in new_donations],
+            *self.__donation_columns([donation for _, donation in new_donations]),
+            [campaign.entity_id for campaign in campaigns],
+            [campaign.account_id for campaign in campaigns],
+            [campaign.goal for campaign in campaigns],
+            [campaign.title for campaign in campaigns],
+            [campaign.description for campaign in campaigns],
+            [campaign.version for campaign in campaigns],
+        )
+
+        if len(rows) != len(campaigns):
+            updated = {row["entity_id"] for row in rows}
+            raise ConcurrencyConflictError(
+                "Campaigns changed concurrently: "
+                f"{[c.entity_id for c in campaigns if c.entity_id not in updated]}"
+            )
+
+    # Only the new donations and one random shard per campaign are written, so
+    # concurrent donations rarely wait for each other, and never conflict:
+    # the aggregate rules hold without the campaign row (the owner can't
+    # change, and idempotency keys are unique in campaign_donations)
+    async def __add_to_shards(self, campaigns: list[Campaign]) -> None:
+        new_donations = [
+            (campaign.entity_id, donation)
+            for campaign in campaigns
+            for donation in campaign.new_donations
+        ]
 
         await self.uow.conn.execute(
             """
-            UPDATE campaigns
-            SET account_id = $2, goal = $3, total_raised = $4, donations = $5, title = $6, description = $7
-            WHERE entity_id = $1
+            WITH inserted AS (
+                INSERT INTO campaign_donations (
+                    campaign_id, idempotency_key, account_id, amount
+                )
+                SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::varchar[], $4::int[])
+                ON CONFLICT (campaign_id, idempotency_key) DO NOTHING
+                RETURNING campaign_id, amount
+            )
+            INSERT INTO campaign_raised_shards (campaign_id, shard, amount)
+            SELECT i.campaign_id, u.shard, SUM(i.amount)
+            FROM inserted i
+            JOIN unnest($5::varchar[], $6::int[]) AS u(entity_id, shard)
+                ON u.entity_id = i.campaign_id
+            GROUP BY i.campaign_id, u.shard
+            ORDER BY i.campaign_id
+            ON CONFLICT (campaign_id, shard)
+            DO UPDATE SET amount = campaign_raised_shards.amount + EXCLUDED.amount
             """,
-            campaign.entity_id,
-            campaign.account_id,
-            campaign.goal,
-            campaign.total_raised,
-            donations,
-            campaign.title,
-            campaign.description,
+            [campaign_id for campaign_id, _ in new_donations],
+            *self.__donation_columns([donation for _, donation in new_donations]),
+            [campaign.entity_id for campaign in campaigns],
+            [random.randrange(campaign.shard_count) for campaign in campaigns],
+        )
+
+    @staticmethod
+    def __donation_columns(
+        donations: list[Donation],
+    ) -> tuple[list[str], list[str], list[int]]:
+        return (
+            [donation.idempotency_key for donation in donations],
+            [donation.account_id for donation in donations],
+            [donation.amount for donation in donations],
         )
 
 
 class MockCampaignRepository(CampaignRepository, MockRepository[Campaign]):
-    pass
+    # Mock campaigns are kept in memory along with all their donations
+    async def load_donations(
+        self, campaigns: list[Campaign], idempotency_keys: list[str]
+    ) -> None:
+        pass
 
 
 def campaign_repository(uow: UnitOfWork) -> CampaignRepository:
@@ -2,9 +2,10 @@ from typing import Annotated
 from uuid import uuid4
 
 from fastapi import Depends, APIRouter
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from bounded_contexts.crowdfunding.adapters.view_factories import campaign_view_factory
+from bounded_contexts.crowdfunding.aggregates import MAX_SHARD_COUNT
 from bounded_contexts.crowdfunding.messages import CreateCampaign, DonateToCampaign
 from bounded_contexts.crowdfunding.views import CampaignView
 from infrastructure.events.bus import event_bus
@@ -18,6 +19,8 @@ class CreateCampaignRequest(BaseModel):
     goal: int
     title: str
     description: str
+    # Opt-in for campaigns expecting many concurrent donations
+    shard_count: int = Field(1, ge=1, le=MAX_SHARD_COUNT)
 
 
 @crowdfunding_router.post("/crowdfunding/campaign")
@@ -33,6 +36,7 @@ async def post_campaign(
         title=body.title,
         description=body.description,
         goal=body.goal,
+        shard_count=body.shard_count,
     )
 
     await event_bus.handle(command)
@@ -25,11 +25,15 @@ class PostgresCampaignViewFactory(CampaignViewFactory):
                     c.title, 
                     c.description, 
                     c.goal, 
-                    c.total_raised, 
+                    c.total_raised + COALESCE(r.amount, 0) AS total_raised, 
                     a.account_id as creator_account_id, 
                     a.username as creator_username  
                 FROM campaigns c
                 JOIN auth_accounts a ON c.account_id = a.account_id
+                LEFT JOIN LATERAL (
+                    SELECT SUM(s.amount) AS amount
+                    FROM campaign_raised_shards s WHERE s.campaign_id = c.entity_id
+                ) r ON true
                 WHERE entity_id = $1
                 """,
                 campaign_id,
@@ -48,11 +52,15 @@ class PostgresCampaignViewFactory(CampaignViewFactory):
                     c.title, 
                     c.description, 
                     c.goal, 
-                    c.total_raised, 
+                    c.total_raised + COALESCE(r.amount, 0) AS total_raised, 
                     a.account_id as creator_account_id, 
                     a.username as creator_username  
                 FROM campaigns c
                 JOIN auth_accounts a ON c.account_id = a.account_id
+                LEFT JOIN LATERAL (
+                    SELECT SUM(s.amount) AS amount
+                    FROM campaign_raised_shards s WHERE s.campaign_id = c.entity_id
+                ) r ON true
                 """,
             )
 
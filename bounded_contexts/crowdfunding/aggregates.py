@@ -2,6 +2,9 @@ from dataclasses import dataclass
 
 from bounded_contexts.common.aggregates import Aggregate
 
+# Every read sums the shards of a campaign, so their amount is kept small
+MAX_SHARD_COUNT = 64
+
 
 @dataclass(frozen=True)
 class Donation:
@@ -20,15 +23,33 @@ class Campaign(Aggregate):
         goal: int,
         total_raised: int = 0,
         donations: list[Donation] | None = None,
+        shard_count: int = 1,
     ) -> None:
         super().__init__(entity_id)
+
+        if not 1 <= shard_count <= MAX_SHARD_COUNT:
+            raise ValueError(f"A campaign needs between 1 and {MAX_SHARD_COUNT} shards")
+
         self._account_id = account_id
         self._title = title
         self._description = description
         self._goal = goal
-        self._donations: list[Donation] = donations if donations else []
         self._total_raised = total_raised
 
+        # Hot campaigns spread their total over many counters (shards), so
+        # concurrent donations don't all write the same row
+        self._shard_count = shard_count
+
+        # Not every donation, only the ones loaded on demand
+        # (see CampaignRepository.load_donations) and the new ones
+        self._donations: list[Donation] = donations if donations else []
+
+        # Hashed, so duplicates are detected in constant time
+        self._donation_keys = {donation.idempotency_key for donation in self._donations}
+
+        # Made since the campaign was loaded, inserted on persist
+        self._new_donations: list[Donation] = []
+
     @property
     def account_id(self) -> str:
         return self._account_id
@@ -49,18 +70,38 @@ class Campaign(Aggregate):
     def total_raised(self) -> int:
         return self._total_raised
 
+    @property
+    def shard_count(self) -> int:
+        return self._shard_count
+
+    @property
+    def new_donations(self) -> list[Donation]:
+        return self._new_donations
+
+    def load_donations(self, donations: list[Donation]) -> None:
+        for donation in donations:
+            if donation.idempotency_key not in self._donation_keys:
+                self._donations.append(donation)
+                self._donation_keys.add(donation.idempotency_key)
+
+    def mark_as_persisted(self, version: int) -> None:
+        super().mark_as_persisted(version)
+        self._new_donations = []
+
     def donate(self, donation: Donation) -> None:
         # We enforce consistency constraints in aggregate roots
-        # If this doesn't scale in the future, we can use lazy loading
-        for previous_donation in self._donations:
-            if previous_donation.idempotency_key == donation.idempotency_key:
-                return
+        # (donations with the same idempotency key must be loaded beforehand)
+        if donation.idempotency_key in self._donation_keys:
+            return
 
         if donation.account_id == self.account_id:
             raise ValueError("Can't donate to your own campaign")
 
         self._donations.append(donation)
+        self._donation_keys.add(donation.idempotency_key)
+        self._new_donations.append(donation)
         self._total_raised += donation.amount
+        self._mark_as_changed()
 
     def goal_reached(self) -> bool:
         return self.total_raised >= self.goal
@@ -11,6 +11,7 @@ from bounded_contexts.crowdfunding.messages import (
     DonateToCampaign,
 )
 from infrastructure.events.bus import event_bus
+from infrastructure.events.retry import CONTENDED_RETRY_POLICY
 from infrastructure.events.uow_factory import make_unit_of_work
 
 
@@ -21,6 +22,7 @@ async def create_campaign_handler(command: CreateCampaign) -> None:
         title=command.title,
         description=command.description,
         goal=command.goal,
+        shard_count=command.shard_count,
     )
 
     async with make_unit_of_work() as uow:
@@ -44,35 +46,48 @@ async def donate_to_campaign_handler(command: DonateToCampaign) -> None:
         )
 
 
-async def register_campaign_donation(
-    command: TransferSucceededEvent,
+async def register_campaign_donations(
+    events: list[TransferSucceededEvent],
 ) -> None:
+    # Transfers not coming from a donation are ignored
+    donations = [
+        (campaign_id, event)
+        for event in events
+        if (campaign_id := event.metadata.get("campaign_id", None)) is not None
+    ]
+
+    if not donations:
+        return
+
     async with make_unit_of_work() as uow:
-        campaign_id: str | None = command.metadata.get("campaign_id", None)
+        # Each campaign is loaded (and persisted) once, however many donations it gets
+        campaign_ids = {campaign_id for campaign_id, _ in donations}
+        found = await campaign_repository(uow).find_by_ids(campaign_ids)
 
-        if campaign_id is None:
-            return
+        assert len(found) == len(campaign_ids)
 
-        campaign: Campaign | None = await campaign_repository(uow).find_by_id(
-            campaign_id
+        await campaign_repository(uow).load_donations(
+            found, [event.idempotency_key for _, event in donations]
         )
 
-        assert campaign
+        campaigns = {campaign.entity_id: campaign for campaign in found}
 
-        campaign.donate(
-            Donation(
-                idempotency_key=command.idempotency_key,
-                amount=command.amount,
-                account_id=command.from_account_id,
+        for campaign_id, event in donations:
+            campaigns[campaign_id].donate(
+                Donation(
+                    idempotency_key=event.idempotency_key,
+                    amount=event.amount,
+                    account_id=event.from_account_id,
+                )
             )
-        )
 
 
 def register_crowdfunding_handlers():
     event_bus.register_command_handler(CreateCampaign, create_campaign_handler)
     event_bus.register_command_handler(DonateToCampaign, donate_to_campaign_handler)
 
-    event_bus.register_event_handler(
+    event_bus.register_batch_event_handler(
         TransferSucceededEvent,
-        register_campaign_donation,
+        register_campaign_donations,
+        retry_policy=CONTENDED_RETRY_POLICY,
     )
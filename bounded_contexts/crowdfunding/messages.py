@@ -1,20 +1,38 @@
 from dataclasses import dataclass
+from typing import Any, ClassVar
 
-from infrastructure.events.messages import Command
+from infrastructure.events.messages import Command, upcaster
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CreateCampaign(Command):
     entity_id: str
     account_id: str
     title: str
     description: str
     goal: int
+    shard_count: int = 1
 
+    message_version: ClassVar[int] = 3
 
-@dataclass(frozen=True)
+    @property
+    def routing_key(self) -> str | None:
+        return self.entity_id
+
+
+# Campaigns created before sharding are unsharded
+@upcaster(CreateCampaign, 2)
+def _upcast_create_campaign_v2(values: list[Any]) -> list[Any]:
+    return [*values, 1]
+
+
+@dataclass(frozen=True, slots=True)
 class DonateToCampaign(Command):
     idempotency_key: str
     campaign_id: str
     account_id: str
     amount: int
+
+    @property
+    def routing_key(self) -> str | None:
+        return self.campaign_id
@@ -1,8 +1,14 @@
-from abc import ABC
+from abc import ABC, abstractmethod
 
 from bounded_contexts.common.ports.repositories import Repository
 from bounded_contexts.crowdfunding.aggregates import Campaign
 
 
 class CampaignRepository(Repository[Campaign], ABC):
-    pass
+    # Campaigns are loaded without their donations, so the donations that
+    # deduplicate new ones (by idempotency key) have to be loaded first
+    @abstractmethod
+    async def load_donations(
+        self, campaigns: list[Campaign], idempotency_keys: list[str]
+    ) -> None:
+        pass
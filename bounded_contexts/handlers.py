@@ -0,0 +1,16 @@
+from bounded_contexts.accounting.handlers import register_accounting_handlers
+from bounded_contexts.auth.handlers import register_auth_handlers
+from bounded_contexts.bitcoin.handlers import register_bitcoin_handlers
+from bounded_contexts.crowdfunding.handlers import register_crowdfunding_handlers
+from infrastructure.events.bus import event_bus
+from infrastructure.events.middleware import metrics_middleware
+
+
+# Register the message handlers of every bounded context, and the bus middleware
+def register_handlers() -> None:
+    register_auth_handlers()
+    register_accounting_handlers()
+    register_crowdfunding_handlers()
+    register_bitcoin_handlers()
+
+    event_bus.add_middleware(metrics_middleware)
@@ -18,10 +18,60 @@ class LNBitsEnvironment:
     invoice_key: str
 
 
+@dataclass(frozen=True)
+class OutboxEnvironment:
+    # Seconds between outbox polls when no notification wakes the processor up
+    fallback_poll_interval: float
+
+    # Run the outbox processor inside the API processes, instead of
+    # (or along with) the standalone worker (see worker.py)
+    embedded_processor: bool
+
+    # Dispatch messages in-process as soon as their transaction commits (only
+    # in processes running a processor), which then only picks up the ones
+    # that failed or were lost
+    immediate_dispatch: bool
+
+    # Maximum amount of messages claimed by a processor at once
+    batch_size: int
+
+    # Seconds a claim is held before other processors can take the messages over
+    lease_seconds: float
+
+    # Maximum amount of message partitions dispatched at the same time
+    max_concurrency: int
+
+    # Failed messages are retried with exponential backoff (in seconds),
+    # and moved to the dead letters table after max_attempts
+    max_attempts: int
+    retry_base_delay: float
+    retry_max_delay: float
+
+    # Seconds of messages (by id) per outbox partition, partitions are dropped
+    # once every message in them is processed
+    partition_interval: float
+
+    # Messages are only redelivered while being retried, so handlers forget
+    # them (see inbox_messages) once no retry can be left
+    @property
+    def inbox_retention(self) -> float:
+        return self.max_attempts * (self.lease_seconds + self.retry_max_delay)
+
+
+@dataclass(frozen=True)
+class EventBusEnvironment:
+    # Maximum amount of handlers running at the same time, per lane.
+    # Keep the background lane under the postgres pool size, so API requests
+    # (the interactive lane) always find connections left under saga backlogs
+    interactive_concurrency: int
+    background_concurrency: int
+
+
 @dataclass(frozen=True)
 class AppEnvironment:
     env_type: EnvType
     postgres_connection_url: str
+    postgres_pool_size: int
     jwt_secret_key: str
 
 
@@ -33,6 +83,7 @@ assert env_type_var, "ENV_TYPE environment variable must be set"
 environment = AppEnvironment(
     env_type=EnvType(env_type_var),
     postgres_connection_url=os.getenv("POSTGRES_CONNECTION_URL") or "",
+    postgres_pool_size=int(os.getenv("POSTGRES_POOL_SIZE") or 10),
     jwt_secret_key=os.getenv("JWT_SECRET_KEY") or "",
 )
 
@@ -42,3 +93,23 @@ lnbits_environment = LNBitsEnvironment(
     admin_key=os.getenv("LNBITS_ADMIN_KEY") or "",
     invoice_key=os.getenv("LNBITS_INVOICE_KEY") or "",
 )
+
+outbox_environment = OutboxEnvironment(
+    fallback_poll_interval=float(os.getenv("OUTBOX_FALLBACK_POLL_INTERVAL") or 5),
+    embedded_processor=(os.getenv("OUTBOX_EMBEDDED_PROCESSOR") or "true").lower()
+    == "true",
+    immediate_dispatch=(os.getenv("OUTBOX_IMMEDIATE_DISPATCH") or "true").lower()
+    == "true",
+    batch_size=int(os.getenv("OUTBOX_BATCH_SIZE") or 100),
+    lease_seconds=float(os.getenv("OUTBOX_LEASE_SECONDS") or 60),
+    max_concurrency=int(os.getenv("OUTBOX_MAX_CONCURRENCY") or 8),
+    max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS") or 10),
+    retry_base_delay=float(os.getenv("OUTBOX_RETRY_BASE_DELAY") or 1),
+    retry_max_delay=float(os.getenv("OUTBOX_RETRY_MAX_DELAY") or 300),
+    partition_interval=float(os.getenv("OUTBOX_PARTITION_INTERVAL") or 3600),
+)
+
+event_bus_environment = EventBusEnvironment(
+    interactive_concurrency=int(os.getenv("EVENT_BUS_INTERACTIVE_CONCURRENCY") or 32),
+    background_concurrency=int(os.getenv("EVENT_BUS_BACKGROUND_CONCURRENCY") or 4),
+)
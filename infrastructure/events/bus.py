@@ -1,18 +1,50 @@
 import asyncio
 import logging
+import time
 from typing import Callable
 
-from retry import retry
-
+from config.env import event_bus_environment
+from infrastructure.events.inbox import (
+    Delivery,
+    DuplicateMessageError,
+    current_delivery,
+)
+from infrastructure.events.lanes import Lane
 from infrastructure.events.messages import Command, Event, Message
+from infrastructure.events.middleware import (
+    CallNext,
+    HandlerCall,
+    Middleware,
+    handler_name,
+)
+from infrastructure.events.retry import DEFAULT_RETRY_POLICY, RetryPolicy
+from infrastructure.events.tracing import Trace, current_trace
+from infrastructure.metrics import metrics_registry
 
 
 logger = logging.getLogger(__name__)
 
+lane_wait_histogram = metrics_registry.histogram(
+    "event_bus_lane_wait_seconds",
+    "Time handlers waited for a free slot in their lane",
+    ("lane",),
+)
+delivery_histogram = metrics_registry.histogram(
+    "message_delivery_delay_seconds",
+    "Time between the creation of messages and the start of their handling",
+    ("message_type",),
+)
+saga_histogram = metrics_registry.histogram(
+    "saga_duration_seconds",
+    "Time from the start of sagas to their last step, a handler emitting nothing",
+    ("message_type", "handler"),
+)
+
 
 class EventBus:
     def __init__(
         self,
+        lane_limits: dict[Lane, int] | None = None,
     ) -> None:
         # Commands can have 1 and only 1 handler
         self._command_handlers: dict[type[Command], Callable] = {}
@@ -20,39 +52,128 @@ class EventBus:
         # Events can have N handlers
         self._event_handlers: dict[type[Event], list[Callable]] = {}
 
+        # Batch handlers receive a list of messages of the same type at once
+        self._batch_handlers: set[Callable] = set()
+
+        # Handlers failing with transient errors are retried, per message type
+        self._retry_policies: dict[type[Message], RetryPolicy] = {}
+
+        # Middleware wraps every handler call, the first added being the outermost
+        self._middlewares: list[Middleware] = []
+        self._pipeline: CallNext = self._execute
+
+        # Lanes without a limit run any amount of handlers at once
+        self._lanes: dict[Lane, asyncio.Semaphore] = {
+            lane: asyncio.Semaphore(limit)
+            for lane, limit in (lane_limits or {}).items()
+        }
+
     def register_command_handler(
-        self, command: type[Command], handler: Callable
+        self,
+        command: type[Command],
+        handler: Callable,
+        retry_policy: RetryPolicy | None = None,
     ) -> None:
         self._command_handlers[command] = handler
 
-    def register_event_handler(self, event: type[Event], handler: Callable) -> None:
+        if retry_policy is not None:
+            self.set_retry_policy(command, retry_policy)
+
+    def register_event_handler(
+        self,
+        event: type[Event],
+        handler: Callable,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
         if event not in self._event_handlers:
             self._event_handlers[event] = []
 
         self._event_handlers[event].append(handler)
 
-    @retry(
-        tries=3,
-        delay=0.1,
-        jitter=0.1,
-    )
-    async def handle(self, message: Message) -> None:
-        if isinstance(message, Command):
-            await self._handle_command(message)
+        if retry_policy is not None:
+            self.set_retry_policy(event, retry_policy)
+
+    def register_batch_command_handler(
+        self,
+        command: type[Command],
+        handler: Callable,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
+        self._batch_handlers.add(handler)
+        self.register_command_handler(command, handler, retry_policy)
+
+    def register_batch_event_handler(
+        self,
+        event: type[Event],
+        handler: Callable,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
+        self._batch_handlers.add(handler)
+        self.register_event_handler(event, handler, retry_policy)
+
+    def handles_batches(self, message: type[Message]) -> bool:
+        if issubclass(message, Command):
+            return self._command_handlers.get(message) in self._batch_handlers
+
+        return any(
+            handler in self._batch_handlers
+            for handler in self._event_handlers.get(message, [])  # type: ignore
+        )
+
+    def set_retry_policy(
+        self, message: type[Message], retry_policy: RetryPolicy
+    ) -> None:
+        self._retry_policies[message] = retry_policy
 
-        elif isinstance(message, Event):
-            await self._handle_event(message)
+    def add_middleware(self, middleware: Middleware) -> None:
+        self._middlewares.append(middleware)
+
+        # The chain is composed once here, not on every handler call
+        pipeline: CallNext = self._execute
+        for middleware in reversed(self._middlewares):
+            pipeline = _chain(middleware, pipeline)
+
+        self._pipeline = pipeline
+
+    async def handle(
+        self,
+        message: Message,
+        deduplicate: bool = False,
+        lane: Lane = Lane.INTERACTIVE,
+    ) -> None:
+        await self.handle_batch([message], deduplicate, lane)
+
+    async def handle_batch(
+        self,
+        messages: list[Message],
+        deduplicate: bool = False,
+        lane: Lane = Lane.INTERACTIVE,
+    ) -> None:
+        # Messages of a batch must share their type. Batch handlers get all of
+        # them in one call, the rest of handlers get them one by one, in order
+        message_type = type(messages[0])
+        assert all(type(message) is message_type for message in messages)
 
-    async def _handle_command(self, command: Command) -> None:
-        handler = self._command_handlers[type(command)]
+        # Messages that might be delivered more than once (i.e. from the outbox)
+        # are deduplicated per handler, through the inbox
+        if issubclass(message_type, Command):
+            handler = self._command_handlers[message_type]
+            await self._call_handler(handler, messages, deduplicate, lane)
 
-        await handler(command)
+        elif issubclass(message_type, Event):
+            await self._handle_event(messages, deduplicate, lane)
 
-    async def _handle_event(self, event: Event) -> None:
-        handlers = self._event_handlers.get(type(event), [])
+    async def _handle_event(
+        self, events: list[Message], deduplicate: bool, lane: Lane
+    ) -> None:
+        handlers = self._event_handlers.get(type(events[0]), [])  # type: ignore
 
         result = await asyncio.gather(
-            *[handler(event) for handler in handlers], return_exceptions=True
+            *[
+                self._call_handler(handler, events, deduplicate, lane)
+                for handler in handlers
+            ],
+            return_exceptions=True,
         )
 
         exceptions = [r for r in result if isinstance(r, Exception)]
@@ -60,5 +181,114 @@ class EventBus:
         for exc in exceptions:
             logger.exception(f"Error handling event: {exc}")
 
+        # Surface failures, so the event is delivered again (handlers are idempotent)
+        if exceptions:
+            raise ExceptionGroup(
+                f"Error handling event '{type(events[0]).__name__}'", exceptions
+            )
+
+    async def _call_handler(
+        self,
+        handler: Callable,
+        messages: list[Message],
+        deduplicate: bool,
+        lane: Lane,
+    ) -> None:
+        batched = handler in self._batch_handlers
+        batches = [messages] if batched else [[message] for message in messages]
+
+        for batch in batches:
+            call = HandlerCall(
+                handler=handler,
+                handler_name=handler_name(handler),
+                messages=batch,
+                batched=batched,
+                deduplicate=deduplicate,
+                lane=lane,
+            )
+
+            await self._pipeline(call)
+
+    async def _execute(self, call: HandlerCall) -> None:
+        now = time.time()
+
+        for message in call.messages:
+            delivery_histogram.observe(
+                now - message.created_at, call.message_type.__name__
+            )
+
+        # Each attempt runs the handler from scratch, with a new unit of work
+        retry_policy = self._retry_policies.get(call.message_type, DEFAULT_RETRY_POLICY)
+
+        await retry_policy.run(lambda: self._run_in_lane(call))
+
+    # Each attempt takes its own slot in the lane, so handlers waiting to be
+    # retried (i.e. backing off) don't hold one
+    async def _run_in_lane(self, call: HandlerCall) -> None:
+        semaphore = self._lanes.get(call.lane)
+
+        if semaphore is None:
+            await self._run_handler(call)
+            return
+
+        start = time.perf_counter()
+
+        async with semaphore:
+            lane_wait_histogram.observe(time.perf_counter() - start, call.lane)
+            await self._run_handler(call)
+
+    async def _run_handler(self, call: HandlerCall) -> None:
+        messages = call.messages
+
+        while messages:
+            if call.deduplicate:
+                delivery_token = current_delivery.set(
+                    Delivery(
+                        handler=call.handler_name,
+                        message_ids=[message.message_id for message in messages],
+                    )
+                )
+
+            trace = Trace(messages)
+            trace_token = current_trace.set(trace)
+
+            try:
+                await call.handler(messages if call.batched else messages[0])
+
+            # The rest of the batch is handled again, without the duplicates
+            except DuplicateMessageError as exc:
+                logger.info(f"Ignoring duplicated messages {exc.message_ids}")
+                duplicates = set(exc.message_ids)
+                messages = [m for m in messages if m.message_id not in duplicates]
+                continue
+
+            finally:
+                current_trace.reset(trace_token)
+
+                if call.deduplicate:
+                    current_delivery.reset(delivery_token)
+
+            # Sagas end with the messages whose handling emits nothing else
+            now = time.time()
+
+            for message in messages:
+                if message.message_id not in trace.causes:
+                    saga_histogram.observe(
+                        now - message.saga_started_at,
+                        call.message_type.__name__,
+                        call.handler_name,
+                    )
+
+            return
+
+
+def _chain(middleware: Middleware, call_next: CallNext) -> CallNext:
+    return lambda call: middleware(call, call_next)
+
 
-event_bus = EventBus()
+event_bus = EventBus(
+    lane_limits={
+        Lane.INTERACTIVE: event_bus_environment.interactive_concurrency,
+        Lane.BACKGROUND: event_bus_environment.background_concurrency,
+    }
+)
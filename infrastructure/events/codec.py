@@ -0,0 +1,298 @@
+# Compact binary codec for messages (i.e. stored in the transactional outbox)
+#
+# A message is encoded as its type name and version, followed by the values of
+# its fields in declaration order. Field names and class paths are never stored,
+# and decoding only instantiates the types registered in `message_types`.
+# Messages stored by older versions of their type are upgraded on decode
+# (see `message_upcasters`).
+
+import struct
+from dataclasses import fields
+from enum import Enum
+from operator import attrgetter
+from typing import Any, get_type_hints
+
+from infrastructure.events.messages import (
+    Message,
+    Upcaster,
+    check_message_type,
+    message_types,
+    message_upcasters,
+)
+
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3
+_FLOAT = 4
+_STR = 5
+_LIST = 6
+_DICT = 7
+_ID = 8
+
+_FLOAT_STRUCT = struct.Struct("<d")
+_unpack_float = _FLOAT_STRUCT.unpack_from
+
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+
+    buffer.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    result = 0
+    shift = 0
+
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+
+        if byte < 0x80:
+            return result, pos
+
+        shift += 7
+
+
+def _write_value(buffer: bytearray, value: Any) -> None:
+    if value is None:
+        buffer.append(_NONE)
+
+    elif value is True:
+        buffer.append(_TRUE)
+
+    elif value is False:
+        buffer.append(_FALSE)
+
+    elif isinstance(value, str):
+        # Ids (32 lowercase hex characters) are stored as their 16 bytes
+        if len(value) == 32:
+            try:
+                raw = bytes.fromhex(value)
+            except ValueError:
+                raw = b""
+
+            if raw.hex() == value:
+                buffer.append(_ID)
+                buffer += raw
+                return
+
+        encoded = value.encode()
+        buffer.append(_STR)
+        _write_varint(buffer, len(encoded))
+        buffer += encoded
+
+    elif isinstance(value, int):
+        # Zigzag encoding, so small negative numbers stay small
+        buffer.append(_INT)
+        _write_varint(buffer, value << 1 if value >= 0 else (-value << 1) - 1)
+
+    elif isinstance(value, float):
+        buffer.append(_FLOAT)
+        buffer += _FLOAT_STRUCT.pack(value)
+
+    elif isinstance(value, (list, tuple)):
+        buffer.append(_LIST)
+        _write_varint(buffer, len(value))
+        for item in value:
+            _write_value(buffer, item)
+
+    elif isinstance(value, dict):
+        buffer.append(_DICT)
+        _write_varint(buffer, len(value))
+        for key, item in value.items():
+            _write_value(buffer, key)
+            _write_value(buffer, item)
+
+    elif isinstance(value, Enum):
+        _write_value(buffer, value.value)
+
+    else:
+        raise TypeError(f"Can't encode value of type '{type(value).__name__}'")
+
+
+def _read_value(data: bytes, pos: int) -> tuple[Any, int]:
+    tag = data[pos]
+    pos += 1
+
+    if tag == _STR:
+        size, pos = _read_varint(data, pos)
+        return data[pos : pos + size].decode(), pos + size
+
+    if tag == _ID:
+        return data[pos : pos + 16].hex(), pos + 16
+
+    if tag == _INT:
+        value, pos = _read_varint(data, pos)
+        return (value >> 1) if not value & 1 else -((value + 1) >> 1), pos
+
+    if tag == _NONE:
+        return None, pos
+
+    if tag == _TRUE:
+        return True, pos
+
+    if tag == _FALSE:
+        return False, pos
+
+    if tag == _FLOAT:
+        return _unpack_float(data, pos)[0], pos + _FLOAT_STRUCT.size
+
+    if tag == _LIST:
+        size, pos = _read_varint(data, pos)
+        items = []
+        for _ in range(size):
+            item, pos = _read_value(data, pos)
+            items.append(item)
+
+        return items, pos
+
+    if tag == _DICT:
+        size, pos = _read_varint(data, pos)
+        mapping = {}
+        for _ in range(size):
+            key, pos = _read_value(data, pos)
+            mapping[key], pos = _read_value(data, pos)
+
+        return mapping, pos
+
+    raise ValueError(f"Invalid value tag '{tag}'")
+
+
+class MessageSchema:
+    def __init__(self, message_type: type[Message]) -> None:
+        check_message_type(message_type)
+
+        self.message_type = message_type
+        self.field_names = [f.name for f in fields(message_type)]
+        self.getter = attrgetter(*self.field_names)
+
+        # Slots are set through their descriptors, bypassing the frozen __setattr__.
+        # Enums are stored as their value, and converted back on decode
+        type_hints = get_type_hints(message_type)
+        self.setters = [
+            (
+                getattr(message_type, name).__set__,
+                hint if isinstance(hint, type) and issubclass(hint, Enum) else None,
+            )
+            for name, hint in ((name, type_hints[name]) for name in self.field_names)
+        ]
+
+        name = message_type.__name__.encode()
+        assert len(name) < 256, f"Message type name too long: '{name.decode()}'"
+
+        header = bytearray([len(name)])
+        header += name
+        _write_varint(header, message_type.message_version)
+        self.header = bytes(header)
+
+    def encode(self, message: Message) -> bytes:
+        buffer = bytearray(self.header)
+
+        for value in self.getter(message):
+            _write_value(buffer, value)
+
+        return bytes(buffer)
+
+    def decode(self, data: bytes, pos: int) -> Message:
+        # Bypass __init__, so stored fields (i.e. message_id) are kept as they are
+        message = object.__new__(self.message_type)
+
+        for setter, converter in self.setters:
+            tag = data[pos]
+
+            # Fast paths for the most common message fields
+            if tag == _ID:
+                value: Any = data[pos + 1 : pos + 17].hex()
+                pos += 17
+            elif tag == _STR and data[pos + 1] < 0x80:
+                end = pos + 2 + data[pos + 1]
+                value = data[pos + 2 : end].decode()
+                pos = end
+            elif tag == _NONE:
+                value = None
+                pos += 1
+            elif tag == _FLOAT:
+                value = _unpack_float(data, pos + 1)[0]
+                pos += 9
+            else:
+                value, pos = _read_value(data, pos)
+
+            setter(message, value if converter is None else converter(value))
+
+        return message
+
+    # Builds a message from the values of its fields, in declaration order
+    def build(self, values: list[Any]) -> Message:
+        if len(values) != len(self.setters):
+            raise ValueError(
+                f"Expected {len(self.setters)} values for "
+                f"'{self.message_type.__name__}', got {len(values)}"
+            )
+
+        message = object.__new__(self.message_type)
+
+        for (setter, converter), value in zip(self.setters, values):
+            setter(message, value if converter is None else converter(value))
+
+        return message
+
+
+class MessageCodec:
+    def __init__(self) -> None:
+        self._schemas: dict[type[Message], MessageSchema] = {}
+
+    def _schema(self, message_type: type[Message]) -> MessageSchema:
+        schema = self._schemas.get(message_type)
+
+        if schema is None:
+            schema = self._schemas[message_type] = MessageSchema(message_type)
+
+        return schema
+
+    def encode(self, message: Message) -> bytes:
+        return self._schema(type(message)).encode(message)
+
+    def decode(self, data: bytes) -> Message:
+        name_size = data[0]
+        name = data[1 : 1 + name_size].decode()
+        version, pos = _read_varint(data, 1 + name_size)
+
+        message_type = message_types.get(name)
+
+        if message_type is None or version > message_type.message_version:
+            raise ValueError(f"Unknown message type '{name}' (version {version})")
+
+        if version == message_type.message_version:
+            return self._schema(message_type).decode(data, pos)
+
+        values = []
+        while pos < len(data):
+            value, pos = _read_value(data, pos)
+            values.append(value)
+
+        # Upgraded one version at a time, up to the current one
+        for old_version in range(version, message_type.message_version):
+            values = self._upcaster(message_type, old_version)(values)
+
+        return self._schema(message_type).build(values)
+
+    # Upcasters of base classes (i.e. Message) apply to all of their subclasses
+    @staticmethod
+    def _upcaster(message_type: type[Message], version: int) -> Upcaster:
+        for cls in message_type.__mro__:
+            upcaster = message_upcasters.get((cls.__name__, version))
+
+            if upcaster is not None:
+                return upcaster
+
+        raise ValueError(
+            f"Can't upgrade message type '{message_type.__name__}' "
+            f"from version {version}"
+        )
+
+
+message_codec = MessageCodec()
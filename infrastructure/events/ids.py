@@ -0,0 +1,38 @@
+import random
+import time
+
+_last_timestamp = 0
+_sequence = 0
+
+
+def time_ordered_id() -> str:
+    """
+    UUIDv7 style id (as 32 hex characters): a millisecond timestamp, a sequence
+      number and random bits. Ids generated by a process are strictly increasing,
+      and sort by creation time across processes.
+    """
+
+    global _last_timestamp, _sequence
+
+    timestamp = time.time_ns() // 1_000_000
+
+    if timestamp > _last_timestamp:
+        _last_timestamp = timestamp
+        _sequence = 0
+    else:
+        # Same millisecond (or clock going backwards), keep increasing
+        _sequence += 1
+
+        if _sequence > 0xFFF:
+            _last_timestamp += 1
+            _sequence = 0
+
+    value = (
+        (_last_timestamp << 80)
+        | (0x7 << 76)
+        | (_sequence << 64)
+        | (0b10 << 62)
+        | random.getrandbits(62)
+    )
+
+    return f"{value:032x}"
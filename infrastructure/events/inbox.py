@@ -0,0 +1,27 @@
+# Consumer side deduplication of messages (see bounded_contexts.common.ports.inbox)
+
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+
+@dataclass
+class Delivery:
+    handler: str
+
+    # Batch handlers receive several messages in a single delivery
+    message_ids: list[str]
+
+    # Set once a unit of work has recorded the delivery in the inbox
+    recorded: bool = False
+
+
+# Delivery of the message currently being handled, if it can be redelivered
+current_delivery: ContextVar[Delivery | None] = ContextVar(
+    "current_delivery", default=None
+)
+
+
+class DuplicateMessageError(Exception):
+    def __init__(self, handler: str, message_ids: list[str]) -> None:
+        super().__init__(f"Messages {message_ids} already handled by '{handler}'")
+        self.message_ids = message_ids
@@ -0,0 +1,11 @@
+from enum import StrEnum
+
+
+# Handlers run in lanes with separate concurrency limits, so background work
+# can't starve the messages someone is waiting for
+class Lane(StrEnum):
+    # Messages handled while a user waits (i.e. commands from the REST routers)
+    INTERACTIVE = "interactive"
+
+    # Messages dispatched from the outbox (i.e. saga steps)
+    BACKGROUND = "background"
@@ -1,28 +1,160 @@
 # Base class for messages
 
+import time
 from abc import ABC
-from dataclasses import dataclass, asdict, field
-from uuid import uuid4
+from dataclasses import dataclass, field, fields
+from operator import attrgetter
+from typing import Any, Callable, ClassVar, get_origin
 
+from infrastructure.events.ids import time_ordered_id
 
-@dataclass(frozen=True)
+# Message types by name, so stored messages can be decoded
+# without importing arbitrary classes (see infrastructure.events.codec)
+message_types: dict[str, type["Message"]] = {}
+
+# Upgrades the field values stored by a version of a message type (in declaration
+# order) to the values of the next version
+type Upcaster = Callable[[list[Any]], list[Any]]
+
+# Upcasters by message type name and the version they upgrade from, so messages
+# stored before a type changed can still be decoded (see upcaster)
+message_upcasters: dict[tuple[str, int], Upcaster] = {}
+
+
+# Message classes are slotted (dataclass(frozen=True, slots=True)), so
+# instances don't carry a __dict__. Subclasses must be declared the same way,
+# or they are rejected when used (see check_message_type)
+@dataclass(frozen=True, slots=True)
 class Message(ABC):
+    # Bump when the fields of a message type change, and register an upcaster
+    # from the previous version (2: correlation fields added to every message)
+    message_version: ClassVar[int] = 2
+
     message_id: str = field(init=False)
 
+    # Messages caused by handling another message share its correlation id,
+    # so every step of a saga can be traced back to the message starting it
+    correlation_id: str = field(init=False)
+    causation_id: str | None = field(init=False)
+
+    # Unix timestamps, of this message and of the message starting its saga
+    created_at: float = field(init=False)
+    saga_started_at: float = field(init=False)
+
+    # Built once per class, see _compile_to_dict
+    _to_dict: ClassVar[Callable[["Message"], dict]]
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        # slots=True creates the class again, so super() can't be called bare
+        super(Message, cls).__init_subclass__(**kwargs)
+
+        # Only the final (slotted) class gets registered
+        if "__slots__" not in cls.__dict__:
+            return
+
+        cls._to_dict = staticmethod(_compile_to_dict(cls))
+
+        registered = message_types.get(cls.__name__)
+        assert (
+            registered is None or registered.__module__ == cls.__module__
+        ), f"Duplicated message type name '{cls.__name__}'"
+
+        message_types[cls.__name__] = cls
+
+    # Messages sharing a routing key (i.e. touching the same aggregate)
+    # are dispatched one after the other, in order
+    @property
+    def routing_key(self) -> str | None:
+        return None
+
     def __post_init__(self):
-        object.__setattr__(self, "message_id", uuid4().hex)
+        # Time ordered, so outbox inserts append to the primary key index
+        message_id = time_ordered_id()
+        object.__setattr__(self, "message_id", message_id)
 
+        # Every message starts its own saga, until it's emitted with a cause
+        now = time.time()
+        object.__setattr__(self, "correlation_id", message_id)
+        object.__setattr__(self, "causation_id", None)
+        object.__setattr__(self, "created_at", now)
+        object.__setattr__(self, "saga_started_at", now)
+
+    def follow(self, cause: "Message") -> None:
+        object.__setattr__(self, "correlation_id", cause.correlation_id)
+        object.__setattr__(self, "causation_id", cause.message_id)
+        object.__setattr__(self, "saga_started_at", cause.saga_started_at)
+
+    # Unlike dataclasses.asdict, containers (i.e. metadata) are copied shallowly
     def to_dict(self) -> dict:
-        return asdict(self)
+        check_message_type(type(self))
+        return type(self)._to_dict(self)
+
+
+def upcaster(
+    message_type: type[Message], version: int
+) -> Callable[[Upcaster], Upcaster]:
+    def register(function: Upcaster) -> Upcaster:
+        key = (message_type.__name__, version)
+        assert key not in message_upcasters, f"Duplicated upcaster for {key}"
+
+        message_upcasters[key] = function
+        return function
+
+    return register
+
+
+# Messages stored before sagas were traced start their own, from the time they are
+# decoded (their actual creation time wasn't stored)
+@upcaster(Message, 1)
+def _upcast_message_v1(values: list[Any]) -> list[Any]:
+    message_id, *message_fields = values
+    now = time.time()
+
+    return [message_id, message_id, None, now, now, *message_fields]
+
+
+# Classes declared without slots=True are neither registered nor compiled,
+# they'd inherit the _to_dict of their parent and could never be decoded
+def check_message_type(message_type: type[Message]) -> None:
+    if message_types.get(message_type.__name__) is not message_type:
+        raise TypeError(
+            f"Message type '{message_type.__name__}' isn't registered, "
+            "declare it with @dataclass(frozen=True, slots=True)"
+        )
+
+
+def _compile_to_dict(message_type: type[Message]) -> Callable[[Message], dict]:
+    message_fields = fields(message_type)
+
+    names = tuple(f.name for f in message_fields)
+    getter = attrgetter(*names)
+
+    containers: list[tuple[str, Callable[[Any], Any]]] = []
+
+    for f in message_fields:
+        container: Any = get_origin(f.type) or f.type
+
+        if container is dict or container is list:
+            containers.append((f.name, container))
+
+    def to_dict(message: Message) -> dict:
+        values = dict(zip(names, getter(message)))
+
+        for name, container in containers:
+            values[name] = container(values[name])
+
+        return values
+
+    return to_dict
 
 
 # Commands can only have one handler
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Command(Message):
     pass
 
 
 # Events can have n handlers
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Event(Message):
     pass
@@ -0,0 +1,71 @@
+# Middleware wrapping the execution of message handlers in the event bus
+#
+# A middleware receives the handler call and the next step of the chain, and
+# must await `call_next(call)` to run the handler (plus any inner middleware).
+
+import time
+from dataclasses import dataclass
+from functools import cache
+from typing import Awaitable, Callable
+
+from infrastructure.events.lanes import Lane
+from infrastructure.events.messages import Message
+from infrastructure.metrics import metrics_registry
+
+
+@dataclass(frozen=True, slots=True)
+class HandlerCall:
+    handler: Callable
+    handler_name: str
+    messages: list[Message]
+    batched: bool
+    deduplicate: bool
+    lane: Lane
+
+    @property
+    def message_type(self) -> type[Message]:
+        return type(self.messages[0])
+
+
+type CallNext = Callable[[HandlerCall], Awaitable[None]]
+type Middleware = Callable[[HandlerCall, CallNext], Awaitable[None]]
+
+
+@cache
+def handler_name(handler: Callable) -> str:
+    return f"{handler.__module__}.{handler.__qualname__}"
+
+
+handler_histogram = metrics_registry.histogram(
+    "message_handler_duration_seconds",
+    "Time spent handling messages, retries included",
+    ("message_type", "handler"),
+)
+in_flight_gauge = metrics_registry.gauge(
+    "message_handlers_in_flight",
+    "Messages being handled right now",
+    ("message_type", "handler"),
+)
+errors_counter = metrics_registry.counter(
+    "message_handler_errors_total",
+    "Message handlers that failed, once retries are exhausted",
+    ("message_type", "handler", "error"),
+)
+
+
+async def metrics_middleware(call: HandlerCall, call_next: CallNext) -> None:
+    labels = (call.message_type.__name__, call.handler_name)
+
+    in_flight_gauge.inc(*labels)
+    start = time.perf_counter()
+
+    try:
+        await call_next(call)
+
+    except Exception as exc:
+        errors_counter.inc(*labels, type(exc).__name__)
+        raise
+
+    finally:
+        in_flight_gauge.dec(*labels)
+        handler_histogram.observe(time.perf_counter() - start, *labels)
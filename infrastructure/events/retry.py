@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from asyncpg.exceptions import (
+    DeadlockDetectedError,
+    PostgresConnectionError,
+    SerializationError,
+)
+
+from infrastructure.events.unit_of_work import ConcurrencyConflictError
+
+logger = logging.getLogger(__name__)
+
+# Errors that may succeed when the handler runs again (with a new transaction)
+TRANSIENT_ERRORS: tuple[type[BaseException], ...] = (
+    SerializationError,
+    DeadlockDetectedError,
+    PostgresConnectionError,
+    ConnectionError,
+    ConcurrencyConflictError,
+)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    tries: int = 3
+
+    # Exponential backoff (in seconds), with full jitter
+    base_delay: float = 0.05
+    max_delay: float = 1.0
+
+    retry_on: tuple[type[BaseException], ...] = TRANSIENT_ERRORS
+
+    async def run[T](self, func: Callable[[], Awaitable[T]]) -> T:
+        attempt = 1
+
+        while True:
+            try:
+                return await func()
+
+            except self.retry_on as exc:
+                if attempt >= self.tries:
+                    raise
+
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                logger.warning(f"Retrying after error (attempt {attempt}): {exc}")
+
+                await asyncio.sleep(random.uniform(0, delay))
+                attempt += 1
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+# For handlers updating hot aggregates (i.e. campaign creator accounts)
+CONTENDED_RETRY_POLICY = RetryPolicy(tries=8, base_delay=0.01, max_delay=0.5)
@@ -0,0 +1,29 @@
+# Tracing of the messages being handled, to link the messages they cause
+
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from infrastructure.events.messages import Message
+
+
+@dataclass
+class Trace:
+    messages: list[Message]
+
+    # Ids of the handled messages that caused new messages
+    causes: set[str] = field(default_factory=set)
+
+    # Messages handled alone are the implicit cause of anything emitted,
+    # while batch handlers have to state the cause of each emitted message
+    def cause(self, explicit_cause: Message | None) -> Message | None:
+        if explicit_cause is not None:
+            return explicit_cause
+
+        if len(self.messages) == 1:
+            return self.messages[0]
+
+        return None
+
+
+# Trace of the handler call currently running, if any
+current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
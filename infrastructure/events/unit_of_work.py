@@ -1,11 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import Callable
+from typing import Any, Awaitable, Callable, Hashable
 
 import asyncpg
 from asyncpg.transaction import Transaction
 
 
+from infrastructure.events.inbox import DuplicateMessageError, current_delivery
 from infrastructure.events.messages import Message
+from infrastructure.events.tracing import current_trace
+
+
+# Raised when an aggregate changed since it was loaded (see Aggregate.version),
+# the handler is then run again from scratch (see infrastructure.events.retry)
+class ConcurrencyConflictError(Exception):
+    pass
+
+
+type PersistenceCallback = Callable[[list[Any]], Awaitable[None]]
 
 
 class UnitOfWork(ABC):
@@ -13,33 +24,90 @@ class UnitOfWork(ABC):
         self._messages: list[Message] = []
 
         # Tracked objects are objects that have been retrieved or created and need to be persisted,
-        # (along with a callback that will do the actual persistence)
-        self._tracked_objects: list[tuple[object, Callable]] = []
+        # grouped (i.e. by repository type) along with a callback persisting the whole group,
+        # so each group is written with as few statements as possible
+        self._tracked_objects: dict[Hashable, list[object]] = {}
+        self._persistence_callbacks: dict[Hashable, PersistenceCallback] = {}
+
+        # Identity map of tracked objects, by group and entity id,
+        # so an object is only loaded, and persisted, once per unit of work
+        self._identity_map: dict[tuple[Hashable, str], object] = {}
+
+    def emit(self, message: Message, cause: Message | None = None) -> None:
+        # Messages emitted while handling another message continue its saga
+        trace = current_trace.get()
+
+        if trace is not None:
+            cause = trace.cause(cause)
+
+        if cause is not None:
+            message.follow(cause)
+
+            if trace is not None:
+                trace.causes.add(cause.message_id)
 
-    def emit(self, message: Message) -> None:
         self._messages.append(message)
 
-    def track_object(self, obj: object, callback: Callable) -> None:
-        self._tracked_objects.append((obj, callback))
+    def track_object(
+        self,
+        group: Hashable,
+        entity_id: str,
+        obj: object,
+        callback: PersistenceCallback,
+    ) -> None:
+        if (group, entity_id) in self._identity_map:
+            return
+
+        self._identity_map[(group, entity_id)] = obj
+        self._tracked_objects.setdefault(group, []).append(obj)
+        self._persistence_callbacks[group] = callback
+
+    def tracked_object(self, group: Hashable, entity_id: str) -> object | None:
+        return self._identity_map.get((group, entity_id))
+
+    async def begin(self) -> None:
+        # Reject redelivered messages before any aggregate is loaded,
+        # recording the delivery in the same transaction as the handler's changes
+        delivery = current_delivery.get()
+
+        if delivery is None or delivery.recorded:
+            return
+
+        # (This could be avoided with proper DI)
+        from bounded_contexts.common.adapters.inbox_adapters import inbox
+
+        duplicates = await inbox(self).record(delivery.handler, delivery.message_ids)
+
+        if duplicates:
+            raise DuplicateMessageError(delivery.handler, duplicates)
+
+        delivery.recorded = True
 
     async def commit(self) -> None:
         # First, persist (update) tracked objects
         # Then, save all stored messages to the outbox
 
-        for obj, persistence_callback in self._tracked_objects:
-            await persistence_callback()
+        for group, objects in self._tracked_objects.items():
+            await self._persistence_callbacks[group](objects)
 
         # (This could be avoided with proper DI)
         from bounded_contexts.common.adapters.outbox_adapters import outbox
 
-        messages = self._messages
-        await outbox(self).store(messages)
+        messages = list(self._messages)
+        transactional_outbox = outbox(self)
+        await transactional_outbox.store(messages)
 
         await self._commit()
 
+        # Hand the committed messages straight to the event bus,
+        # the outbox being the durable fallback
+        transactional_outbox.dispatch(messages)
+
     async def rollback(self) -> None:
         self._messages.clear()
         self._tracked_objects.clear()
+        self._persistence_callbacks.clear()
+        self._identity_map.clear()
         await self._rollback()
 
     @abstractmethod
@@ -13,7 +13,9 @@ from infrastructure.postgres import postgres_pool
 @contextlib.asynccontextmanager
 async def make_postgres_unit_of_work() -> AsyncGenerator[PostgresUnitOfWork, None]:
     async with postgres_pool.get_pool().acquire() as conn:
-        transaction = conn.transaction(isolation="repeatable_read")
+        # Aggregates are protected by their version (optimistic concurrency),
+        # so there's no need for snapshots nor serialization failures
+        transaction = conn.transaction(isolation="read_committed")
         await transaction.start()
 
         uow = PostgresUnitOfWork(
@@ -22,6 +24,8 @@ async def make_postgres_unit_of_work() -> AsyncGenerator[PostgresUnitOfWork, Non
         )
 
         try:
+            await uow.begin()
+
             yield uow
 
             await uow.commit()
@@ -34,6 +38,8 @@ async def make_postgres_unit_of_work() -> AsyncGenerator[PostgresUnitOfWork, Non
 async def make_mock_unit_of_work() -> AsyncGenerator[MockUnitOfWork, None]:
     uow = MockUnitOfWork()
 
+    await uow.begin()
+
     yield uow
 
 
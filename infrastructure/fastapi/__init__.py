@@ -1 +1,2 @@
 from .auth import get_account_id
+from .metrics import metrics_router
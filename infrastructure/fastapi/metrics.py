@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from infrastructure.metrics import metrics_registry
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> str:
+    return await metrics_registry.render()
@@ -0,0 +1,2 @@
+from .registry import Counter, Gauge, Histogram, MetricsRegistry, metrics_registry
+from .server import serve_metrics
@@ -0,0 +1,173 @@
+# Minimal in-process metrics, rendered in the prometheus text format
+
+import logging
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names: tuple[str, ...], labels: tuple[str, ...]) -> str:
+    if not label_names:
+        return ""
+
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(label_names, labels)
+    )
+
+    return "{" + pairs + "}"
+
+
+class Metric(ABC):
+    metric_type = ""
+
+    def __init__(
+        self, name: str, documentation: str, label_names: tuple[str, ...] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+            *self._render_samples(),
+        ]
+
+    @abstractmethod
+    def _render_samples(self) -> list[str]:
+        pass
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, label_names: tuple[str, ...] = ()
+    ) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _render_samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {value}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, label_names)
+        self.buckets = buckets
+
+        # Per labels: observations per bucket (the last one being +Inf), and sum
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self._counts.get(labels)
+
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0
+
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def _render_samples(self) -> list[str]:
+        samples = []
+
+        for labels, counts in self._counts.items():
+            cumulative = 0
+
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else str(bound)
+                bucket_labels = _format_labels((*self.label_names, "le"), (*labels, le))
+                samples.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+
+            formatted = _format_labels(self.label_names, labels)
+            samples.append(f"{self.name}_sum{formatted} {self._sums[labels]}")
+            samples.append(f"{self.name}_count{formatted} {cumulative}")
+
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+        # Collectors refresh metrics (i.e. gauges read from the database) on render
+        self._collectors: list[Callable[[], Awaitable[None]]] = []
+
+    def counter(
+        self, name: str, documentation: str, label_names: tuple[str, ...] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(
+        self, name: str, documentation: str, label_names: tuple[str, ...] = ()
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def add_collector(self, collector: Callable[[], Awaitable[None]]) -> None:
+        self._collectors.append(collector)
+
+    async def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                await collector()
+            except Exception as exc:
+                logger.error(f"Error collecting metrics: {exc}")
+
+        lines = [line for metric in self._metrics.values() for line in metric.render()]
+
+        return "\n".join(lines) + "\n"
+
+    def _register[T: Metric](self, metric: T) -> T:
+        assert metric.name not in self._metrics, f"Duplicated metric '{metric.name}'"
+
+        self._metrics[metric.name] = metric
+        return metric
+
+
+metrics_registry = MetricsRegistry()
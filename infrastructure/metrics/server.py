@@ -0,0 +1,30 @@
+import asyncio
+
+from infrastructure.metrics.registry import metrics_registry
+
+
+# Bare HTTP server exposing the metrics, for processes without a web framework
+async def serve_metrics(port: int) -> asyncio.Server:
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            # Any request gets the metrics back, so its content is ignored
+            await reader.readuntil(b"\r\n\r\n")
+
+            body = (await metrics_registry.render()).encode()
+
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                + f"Content-Length: {len(body)}\r\n".encode()
+                + b"Connection: close\r\n\r\n"
+                + body
+            )
+            await writer.drain()
+
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, port=port)
@@ -1,6 +1,7 @@
 from bounded_contexts.accounting.adapters.aggregate_ddl import ACCOUNTING_AGGREGATE_DDL
 from bounded_contexts.auth.adapters.aggregate_ddl import AUTH_ACCOUNT_DDL
 from bounded_contexts.bitcoin.adapters.aggregate_ddl import BTC_INVOICES_AGGREGATE_DDL
+from bounded_contexts.common.adapters.inbox_ddl import INBOX_DDL
 from bounded_contexts.common.adapters.outbox_ddl import OUTBOX_DDL
 from bounded_contexts.crowdfunding.adapters.aggregate_ddl import CAMPAIGN_AGGREGATE_DDL
 from infrastructure.postgres.pool import postgres_pool
@@ -8,6 +9,7 @@ from infrastructure.postgres.pool import postgres_pool
 
 DDL_LIST = [
     OUTBOX_DDL,
+    INBOX_DDL,
     CAMPAIGN_AGGREGATE_DDL,
     BTC_INVOICES_AGGREGATE_DDL,
     ACCOUNTING_AGGREGATE_DDL,
@@ -15,7 +17,22 @@ DDL_LIST = [
 ]
 
 
+# Arbitrary advisory lock key, held while running the DDLs
+DDL_LOCK_KEY = 7_340_215_118
+
+# DDLs that have to lock a table in use give up after this, instead of
+# stalling every query queued behind them
+DDL_LOCK_TIMEOUT = "2s"
+
+
+# Changes to existing tables are guarded (i.e. by information_schema), so once
+# applied, DDLs don't lock the tables anymore and can run at every startup
 async def execute_ddl() -> None:
-    async with postgres_pool.get_pool().acquire() as conn:
+    # API processes and workers start at the same time, so the DDLs (and the
+    # data migrations in them) run one process after the other, never concurrently
+    async with postgres_pool.get_pool().acquire() as conn, conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", DDL_LOCK_KEY)
+        await conn.execute(f"SET LOCAL lock_timeout = '{DDL_LOCK_TIMEOUT}'")
+
         for ddl in DDL_LIST:
             await conn.execute(ddl)
@@ -1,4 +1,4 @@
-from asyncpg import Pool, create_pool
+from asyncpg import Connection, Pool, connect, create_pool
 
 from config.env import environment
 
@@ -7,8 +7,10 @@ class PostgresPool:
     def __init__(
         self,
         connection_url: str,
+        pool_size: int,
     ) -> None:
         self._connection_url: str = connection_url
+        self._pool_size: int = pool_size
         self._pool: Pool | None = None
 
     def get_pool(self) -> Pool:
@@ -16,14 +18,24 @@ class PostgresPool:
         return self._pool
 
     async def start_pool(self) -> Pool:
-        self._pool = await create_pool(dsn=self._connection_url)
+        self._pool = await create_pool(
+            dsn=self._connection_url,
+            min_size=self._pool_size,
+            max_size=self._pool_size,
+        )
         assert self._pool is not None, "ERROR: Postgres connection pool not started"
         return self._pool
 
+    async def connect(self) -> Connection:
+        # Dedicated connection, outside the pool (i.e. for LISTEN)
+        return await connect(dsn=self._connection_url)
+
     async def cleanup(self) -> None:
         assert self._pool is not None, "ERROR: Postgres connection pool not started"
         await self._pool.close()
         self._pool = None
 
 
-postgres_pool = PostgresPool(environment.postgres_connection_url)
+postgres_pool = PostgresPool(
+    environment.postgres_connection_url, environment.postgres_pool_size
+)
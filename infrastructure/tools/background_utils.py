@@ -40,13 +40,9 @@ class BackgroundTaskService:
         )
 
     async def await_tasks(self) -> None:
-        """Await all background tasks to complete"""
-        tasks = list(self.__tasks)
-
-        if not tasks:
-            return
-
-        await asyncio.wait(tasks)
+        """Await all background tasks to complete, including the ones they start"""
+        while self.__tasks:
+            await asyncio.wait(list(self.__tasks))
 
 
 background_service = BackgroundTaskService()
@@ -1,16 +1,16 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from bounded_contexts.accounting.handlers import register_accounting_handlers
 from bounded_contexts.auth.adapters.rest import auth_router
-from bounded_contexts.auth.handlers import register_auth_handlers
 from bounded_contexts.bitcoin.adapters.rest import bitcoin_router
 from bounded_contexts.common.adapters.outbox_adapters import process_outbox
 from bounded_contexts.crowdfunding.adapters.rest import crowdfunding_router
-from bounded_contexts.crowdfunding.handlers import register_crowdfunding_handlers
-from bounded_contexts.bitcoin.handlers import register_bitcoin_handlers
 from bounded_contexts.dashboard.adapters.rest import dashboard_router
+from bounded_contexts.handlers import register_handlers
+from config.env import outbox_environment
+from infrastructure.fastapi import metrics_router
 from infrastructure.postgres import postgres_pool, execute_ddl
 from infrastructure.tools.background_utils import background_service
 
@@ -25,20 +25,24 @@ async def lifespan(_app: FastAPI):
     await postgres_pool.start_pool()
     await execute_ddl()
 
-    # Periodically process the transactional outbox
-    background_service.run_fire_forget_coroutine(process_outbox())
+    # Process the transactional outbox in the background,
+    # unless it is left to standalone workers (see worker.py)
+    stop_outbox = asyncio.Event()
+
+    if outbox_environment.embedded_processor:
+        background_service.run_fire_forget_coroutine(process_outbox(stop_outbox))
 
     yield
 
-    # Close the connection pool
+    # Let in-flight messages finish before closing the connection pool
+    stop_outbox.set()
+    await background_service.await_tasks()
+
     await postgres_pool.cleanup()
 
 
 # Register message handlers
-register_auth_handlers()
-register_accounting_handlers()
-register_crowdfunding_handlers()
-register_bitcoin_handlers()
+register_handlers()
 
 # Create FastApi application
 app = FastAPI(lifespan=lifespan)
@@ -49,3 +53,4 @@ app.include_router(auth_router)
 app.include_router(crowdfunding_router)
 app.include_router(bitcoin_router)
 app.include_router(dashboard_router)
+app.include_router(metrics_router)
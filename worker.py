@@ -0,0 +1,99 @@
+# Standalone transactional outbox worker
+#
+# Usage: python worker.py [--processes K] [--metrics-port PORT]
+#
+# Workers claim disjoint batches of messages, so any amount of them can run
+# along with the API (see OUTBOX_EMBEDDED_PROCESSOR to turn its processor off)
+
+import argparse
+import asyncio
+import multiprocessing
+import signal
+
+from bounded_contexts.common.adapters.outbox_adapters import process_outbox
+from bounded_contexts.handlers import register_handlers
+from infrastructure.metrics import serve_metrics
+from infrastructure.postgres import postgres_pool, execute_ddl
+from infrastructure.tools.background_utils import background_service
+
+
+async def run_worker(metrics_port: int | None) -> None:
+    register_handlers()
+
+    await postgres_pool.start_pool()
+    await execute_ddl()
+
+    metrics_server = await serve_metrics(metrics_port) if metrics_port else None
+
+    # On SIGTERM (or ctrl+c), finish the in-flight batch and exit
+    stop = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+
+    try:
+        await process_outbox(stop)
+
+        # Messages dispatched right after commit, by the handlers themselves
+        await background_service.await_tasks()
+
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+            await metrics_server.wait_closed()
+
+        await postgres_pool.cleanup()
+
+
+def run_worker_process(metrics_port: int | None) -> None:
+    asyncio.run(run_worker(metrics_port))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Transactional outbox worker")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="amount of worker processes to run",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="serve metrics over HTTP (process i listens on PORT + i)",
+    )
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_worker_process(args.metrics_port)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=run_worker_process,
+            args=(args.metrics_port + i if args.metrics_port else None,),
+            name=f"outbox_worker_{i}",
+        )
+        for i in range(args.processes)
+    ]
+
+    for process in processes:
+        process.start()
+
+    # Forward SIGTERM, so every worker drains its in-flight batch
+    def terminate(*_) -> None:
+        for process in processes:
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, terminate)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()